@@ -331,7 +331,8 @@ def main():
                     st.markdown(f"**📋 {len(results)}টি ফলাফল পাওয়া গেছে:**")
                     
                     for i, result in enumerate(results, 1):
-                        with st.expander(f"ফলাফল {i}: {result['document']} (স্কোর: {result['score']:.3f})"):
+                        score = f" (স্কোর: {result['score']:.3f})" if result['score'] is not None else ""
+                        with st.expander(f"ফলাফল {i}: {result['document']}{score}"):
                             st.write(result['text'])
                 else:
                     st.warning("কোনো ফলাফল পাওয়া যায়নি।")
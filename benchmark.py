@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Bangladesh Legal RAG Assistant
+
+Usage:
+    python benchmark.py pdf-backends [--backends pypdf2 pdfium pdfminer]
+    python benchmark.py ann [--vectors 100000] [--factories Flat IVF1024,Flat HNSW32]
+    python benchmark.py storage [--index Flat] [--storage float32 float16 sq8] [--pca 0 128]
+    python benchmark.py embeddings [--backends onnx onnx-int8] [--threshold 0.99]
+    python benchmark.py embedding-workers [--workers 1 2 4]
+    python benchmark.py startup [--runs 5] [--query "..."]
+    python benchmark.py routing [--documents 1 2 3 5] [--questions questions.txt]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from config import Config
+from ocr import bengali_ratio
+
+def benchmark_pdf_backends(data_path: str, backends: List[str]) -> List[Dict]:
+    """
+    Measure pages/second and extracted characters for every backend on every PDF
+    """
+    from pdf_processor import BengaliPDFProcessor
+
+    results = []
+    for backend in backends:
+        try:
+            processor = BengaliPDFProcessor(data_path, backend=backend)
+        except ImportError as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+
+        for pdf_file in processor.list_pdf_files():
+            start_time = time.perf_counter()
+            try:
+                page_count = processor.backend.page_count(pdf_file)
+                texts = [page_text for _, page_text in processor.backend.iter_pages(pdf_file)]
+            except Exception as e:
+                print(f"{backend}: failed on {pdf_file.name}: {e}")
+                continue
+            elapsed = time.perf_counter() - start_time
+
+            text = " ".join(texts)
+            results.append({
+                "backend": backend,
+                "document": pdf_file.stem,
+                "pages": page_count,
+                "seconds": elapsed,
+                "pages_per_second": page_count / elapsed if elapsed > 0 else 0.0,
+                "characters": len(text),
+                "bengali_ratio": bengali_ratio(text)
+            })
+
+    print(f"\n{'backend':<10} {'pages':>6} {'sec':>8} {'pages/s':>9} {'chars':>10} {'bengali':>8}  document")
+    for row in results:
+        print(f"{row['backend']:<10} {row['pages']:>6} {row['seconds']:>8.2f} {row['pages_per_second']:>9.1f} "
+              f"{row['characters']:>10} {row['bengali_ratio']:>8.1%}  {row['document']}")
+
+    print("\nTotals:")
+    for backend in backends:
+        rows = [row for row in results if row["backend"] == backend]
+        if not rows:
+            continue
+        pages = sum(row["pages"] for row in rows)
+        seconds = sum(row["seconds"] for row in rows)
+        characters = sum(row["characters"] for row in rows)
+        bengali = sum(row["bengali_ratio"] * row["characters"] for row in rows) / characters if characters else 0.0
+        print(f"  {backend:<10} {pages} pages in {seconds:.2f}s ({pages / seconds if seconds else 0:.1f} pages/s), "
+              f"{characters} chars, {bengali:.1%} Bengali")
+
+    return results
+
+def _synthetic_vectors(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """
+    Normalized vectors scattered around random centers, roughly like topic-clustered embeddings
+    """
+    rng = np.random.RandomState(seed)
+    centers = rng.randn(max(count // 100, 1), dimension).astype('float32')
+    vectors = centers[rng.randint(len(centers), size=count)] + 0.5 * rng.randn(count, dimension).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _load_index_vectors(db_path: str) -> np.ndarray:
+    """
+    Reconstruct all vectors of a saved flat index
+    """
+    import faiss
+    from pathlib import Path
+    from index_snapshots import snapshot_data_path
+
+    index = faiss.read_index(str(snapshot_data_path(Path(db_path)) / "faiss_index.bin"))
+    return index.reconstruct_n(0, index.ntotal)
+
+def benchmark_ann(vectors: np.ndarray, factories: List[str], queries: int, top_k: int,
+                  nprobes: List[int], ef_searches: List[int], train_size: int) -> List[Dict]:
+    """
+    Recall@k and single-query p50/p99 latency of ANN index types against exact flat search
+    
+    Queries are held-out vectors, so every index type sees the same workload.
+    """
+    import faiss
+    from vector_database import apply_search_parameters, create_faiss_index
+
+    rng = np.random.RandomState(1)
+    order = rng.permutation(len(vectors))
+    query_vectors = vectors[order[:queries]]
+    base_vectors = np.ascontiguousarray(vectors[order[queries:]])
+    dimension = base_vectors.shape[1]
+    print(f"{len(base_vectors)} vectors of dimension {dimension}, {queries} queries, recall@{top_k}")
+
+    exact = faiss.IndexFlatIP(dimension)
+    exact.add(base_vectors)
+    _, truth = exact.search(query_vectors, top_k)
+
+    results = []
+    for factory in factories:
+        start_time = time.perf_counter()
+        index = create_faiss_index(factory, dimension)
+        if not index.is_trained:
+            sample = base_vectors[rng.choice(len(base_vectors), min(train_size, len(base_vectors)), replace=False)]
+            try:
+                index.train(sample)
+            except RuntimeError as e:
+                print(f"Skipping {factory}: {e}")
+                continue
+        index.add(base_vectors)
+        build_seconds = time.perf_counter() - start_time
+        index_mb = faiss.serialize_index(index).nbytes / 2**20
+
+        if faiss.try_extract_index_ivf(index) is not None:
+            settings = [(nprobe, 0) for nprobe in nprobes]
+        elif "HNSW" in factory:
+            settings = [(0, ef_search) for ef_search in ef_searches]
+        else:
+            settings = [(0, 0)]
+
+        for nprobe, ef_search in settings:
+            apply_search_parameters(index, nprobe, ef_search)
+            latencies = []
+            found = []
+            for query in query_vectors:
+                start_time = time.perf_counter()
+                _, ids = index.search(query[None, :], top_k)
+                latencies.append(time.perf_counter() - start_time)
+                found.append(ids[0])
+
+            recall = np.mean([len(set(ids) & set(expected)) / top_k for ids, expected in zip(found, truth)])
+            results.append({
+                "factory": factory,
+                "nprobe": nprobe,
+                "ef_search": ef_search,
+                "build_seconds": build_seconds,
+                "index_mb": index_mb,
+                "recall": float(recall),
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p99_ms": float(np.percentile(latencies, 99) * 1000)
+            })
+
+    print(f"\n{'index':<20} {'nprobe':>7} {'efSearch':>9} {'build s':>8} {'MB':>8} "
+          f"{'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in results:
+        print(f"{row['factory']:<20} {row['nprobe'] or '-':>7} {row['ef_search'] or '-':>9} "
+              f"{row['build_seconds']:>8.2f} {row['index_mb']:>8.1f} {row['recall']:>7.3f} "
+              f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+
+    return results
+
+# Built-in questions, used when there is no saved index to sample from
+_LEGAL_SENTENCES = (
+    "বাংলাদেশের সংবিধানের ২৭ অনুচ্ছেদ অনুযায়ী আইনের দৃষ্টিতে সকল নাগরিক সমান।",
+    "সংবিধানের ৩১ অনুচ্ছেদে আইনের আশ্রয় লাভের অধিকারের কথা বলা হয়েছে।",
+    "দণ্ডবিধির ৪২০ ধারায় প্রতারণার শাস্তির বিধান রয়েছে।",
+    "অবৈধ দখলের ক্ষেত্রে দণ্ডবিধির ৪৪৭ ধারা প্রযোজ্য।",
+    "তালাকের নোটিশ চেয়ারম্যানের কাছে পাঠাতে হয়।",
+    "খোরপোশ কত দিন পাওয়া যায়?",
+    "পারিবারিক আদালতে মামলা করার নিয়ম কী?",
+    "বাড়ি ভাড়া নিয়ন্ত্রণ আইন অনুযায়ী ভাড়াটিয়ার অধিকার",
+)
+
+def _sample_texts(db_path: str, count: int) -> List[str]:
+    """
+    Chunk texts from a saved index, or a few built-in legal sentences if there is none
+    """
+    from pathlib import Path
+    from chunk_store import MappedChunks, chunk_store_exists
+    from index_snapshots import snapshot_data_path
+
+    data_path = snapshot_data_path(Path(db_path))
+    if chunk_store_exists(data_path):
+        chunks = MappedChunks(data_path)
+        step = max(len(chunks) // count, 1)
+        return [chunks[i] for i in range(0, len(chunks), step)][:count]
+
+    return list(_LEGAL_SENTENCES)
+
+def benchmark_embeddings(backends: List[str], texts: List[str], threshold: float, batch_size: int) -> bool:
+    """
+    Check each backend's embeddings against the PyTorch ones and measure their speed
+
+    Returns False if any backend falls below the cosine threshold.
+    """
+    from embedding_backends import check_parity, get_embedding_backend, measure_throughput
+
+    reference = get_embedding_backend("sentence-transformers", Config.EMBEDDING_MODEL)
+    print(f"{len(texts)} texts, parity threshold {threshold}")
+
+    rows = [{**measure_throughput(reference, texts, batch_size), 'min_cosine': 1.0, 'passed': True}]
+    for name in backends:
+        try:
+            backend = get_embedding_backend(name, Config.EMBEDDING_MODEL, onnx_path=Config.ONNX_MODEL_PATH,
+                                            threads=Config.EMBEDDING_THREADS)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        parity = check_parity(backend, reference, texts, threshold)
+        rows.append({**measure_throughput(backend, texts, batch_size), **parity})
+
+    print(f"\n{'backend':<60} {'min cos':>8} {'parity':>7} {'p50 ms':>8} {'p99 ms':>8} {'texts/s':>9}")
+    for row in rows:
+        print(f"{row['backend']:<60} {row['min_cosine']:>8.4f} {'ok' if row['passed'] else 'FAIL':>7} "
+              f"{row['single_p50_ms']:>8.2f} {row['single_p99_ms']:>8.2f} {row['batch_texts_per_second']:>9.1f}")
+
+    return all(row['passed'] for row in rows)
+
+def benchmark_embedding_workers(texts: List[str], workers: List[int], batch_size: int) -> List[Dict]:
+    """
+    Build-time embedding throughput per number of worker processes
+
+    One worker is the in-process model. Worker start-up (spawning and loading
+    the model copies) is timed separately from encoding; every result is checked
+    against the in-process embeddings to confirm the input order is kept.
+    """
+    from embedding_backends import ParallelEncoder, get_embedding_backend
+
+    backend = get_embedding_backend(Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL,
+                                    onnx_path=Config.ONNX_MODEL_PATH, threads=Config.EMBEDDING_THREADS)
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # Warm up
+    start_time = time.perf_counter()
+    reference = backend.encode(texts, batch_size=batch_size)
+    reference_seconds = time.perf_counter() - start_time
+    print(f"{len(texts)} texts, {Config.EMBEDDING_BACKEND}, batch size {batch_size}")
+
+    reference_rate = len(texts) / reference_seconds
+    results = []
+    for count in workers:
+        if count <= 1:
+            results.append({'workers': 1, 'startup_seconds': 0.0, 'texts_per_second': reference_rate,
+                            'min_cosine': 1.0})
+            continue
+
+        start_time = time.perf_counter()
+        encoder = ParallelEncoder(Config.EMBEDDING_BACKEND, Config.EMBEDDING_MODEL, count,
+                                  onnx_path=Config.ONNX_MODEL_PATH, threads_per_worker=Config.EMBEDDING_THREADS)
+        try:
+            # One batch per worker, so every worker has loaded its model before timing
+            encoder.encode(texts[:batch_size * count], batch_size)
+            startup_seconds = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            embeddings = encoder.encode(texts, batch_size, backend.tokenizer)
+            seconds = time.perf_counter() - start_time
+        finally:
+            encoder.close()
+
+        cosines = (embeddings * reference).sum(axis=1) / (
+            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1))
+        results.append({'workers': count, 'startup_seconds': startup_seconds,
+                        'texts_per_second': len(texts) / seconds, 'min_cosine': float(cosines.min())})
+
+    print(f"\n{'workers':>7} {'startup s':>10} {'texts/s':>9} {'speedup':>8} {'min cos':>8}")
+    for row in results:
+        print(f"{row['workers']:>7} {row['startup_seconds']:>10.2f} {row['texts_per_second']:>9.1f} "
+              f"{row['texts_per_second'] / reference_rate:>8.2f} {row['min_cosine']:>8.4f}")
+
+    return results
+
+# Run in a fresh interpreter per measurement, so nothing is already imported or loaded
+_STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import rag_system
+imported = time.perf_counter()
+rag_system.Config.EMBEDDING_WARMUP = sys.argv[2] == "1"
+system = rag_system.BangladeshLegalRAGSystem()
+ok = system.initialize_system()
+initialized = time.perf_counter()
+while rag_system.Config.EMBEDDING_WARMUP and not system.vector_db.embedding_model_loaded:
+    time.sleep(0.005)
+ready = time.perf_counter()
+system.vector_db.get_context_for_query(sys.argv[1])
+answered = time.perf_counter()
+print(json.dumps({'ok': ok, 'import': imported - start, 'initialize': initialized - imported,
+                  'warm_up': ready - initialized, 'first_query': answered - ready, 'total': answered - start}))
+"""
+
+def _import_offenders(module: str, count: int) -> List[Dict]:
+    """
+    Direct imports of module with the largest cumulative time, from python -X importtime
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    offenders = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # Nested imports are indented two spaces per level
+        if depth == 1:
+            offenders.append({'module': name.strip(), 'ms': int(cumulative) / 1000})
+    return sorted(offenders, key=lambda row: -row['ms'])[:count]
+
+def benchmark_startup(query: str, runs: int) -> List[Dict]:
+    """
+    Cold-start time to import, initialize over a saved index and answer a first query
+
+    Each run is a fresh process. Without warm-up the embedding model loads on the
+    first query; with it the model loads in the background after initialization,
+    and the first query is timed once that is done. Medians over runs.
+    """
+    results = []
+    for warmup in (False, True):
+        timings = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, query, "1" if warmup else "0"],
+                                    capture_output=True, text=True)
+            if output.returncode != 0:
+                print(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else "Startup run failed")
+                return results
+            timings.append(json.loads(output.stdout.strip().splitlines()[-1]))
+        if not all(timing['ok'] for timing in timings):
+            print("System initialization failed; build the index first (python run.py setup)")
+        results.append({'mode': "warm-up" if warmup else "lazy",
+                        **{phase: float(np.median([timing[phase] for timing in timings]))
+                           for phase in ('import', 'initialize', 'warm_up', 'first_query', 'total')}})
+
+    print(f"{runs} runs per mode, query: {query}")
+    print(f"\n{'mode':<10} {'import s':>9} {'init s':>9} {'warm-up s':>10} {'query s':>9} {'total s':>9}")
+    for row in results:
+        print(f"{row['mode']:<10} {row['import']:>9.3f} {row['initialize']:>9.3f} {row['warm_up']:>10.3f} "
+              f"{row['first_query']:>9.3f} {row['total']:>9.3f}")
+
+    print(f"\n{'slowest imports by rag_system':<40} {'ms':>8}")
+    for row in _import_offenders("rag_system", 8):
+        print(f"{row['module']:<40} {row['ms']:>8.1f}")
+
+    return results
+
+def benchmark_routing(db_path: str, questions: List[str], documents: List[int], top_k: int) -> List[Dict]:
+    """
+    Recall@k, latency and share of chunks scored of two-stage routed search against exhaustive search
+    
+    Questions are embedded once up front, so the timings cover only the search.
+    Recall is measured against the exhaustive search of the same index.
+    """
+    from rag_system import vector_db_options
+    from vector_database import LegalVectorDatabase
+
+    database = LegalVectorDatabase(db_path=db_path, **vector_db_options())
+    if not database.load_index():
+        print(f"No saved index in {db_path}")
+        return []
+    router = database.document_router()
+    document_rows = database._document_rows()
+    vectors = database.embed_queries(questions)
+    print(f"{len(database.chunks)} chunks in {len(router.documents)} documents, {len(router)} routing vectors, "
+          f"{len(questions)} questions, recall@{top_k}")
+
+    results = []
+    truth = None
+    for count in [0] + [count for count in documents if count > 0]:
+        database.route_documents = count
+        latencies = []
+        found = []
+        for vector in vectors:
+            start_time = time.perf_counter()
+            _, rows = database._dense_search(vector[None, :], top_k)
+            latencies.append(time.perf_counter() - start_time)
+            found.append(set(rows[0][rows[0] >= 0].tolist()))
+        if truth is None:
+            truth = found
+
+        if count and count < len(document_rows):
+            scored = np.mean([len(np.unique(np.concatenate([document_rows[name] for name in names])))
+                              for names in router.route(vectors, count)])
+        else:
+            scored = len(database.chunks)
+        results.append({
+            "documents": count or "all",
+            "recall": float(np.mean([len(rows & expected) / max(len(expected), 1)
+                                     for rows, expected in zip(found, truth)])),
+            "scored": float(scored / max(len(database.chunks), 1)),
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p99_ms": float(np.percentile(latencies, 99) * 1000)
+        })
+
+    print(f"\n{'documents':>9} {'recall':>7} {'scored':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for row in results:
+        print(f"{row['documents']:>9} {row['recall']:>7.3f} {row['scored']:>7.1%} "
+              f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+
+    return results
+
+def main():
+    """Parse arguments and run the selected benchmark"""
+    parser = argparse.ArgumentParser(description="Bangladesh Legal RAG Assistant benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    pdf_parser = subparsers.add_parser("pdf-backends", help="PDF text extraction throughput per backend")
+    pdf_parser.add_argument("--data", default=Config.PDF_DATA_PATH, help="Directory with PDF files")
+    pdf_parser.add_argument("--backends", nargs="+", default=["pypdf2", "pdfium", "pdfminer"])
+
+    ann_parser = subparsers.add_parser("ann", help="Recall and latency of ANN index types against flat search")
+    ann_parser.add_argument("--vectors", type=int, default=100000, help="Synthetic corpus size")
+    ann_parser.add_argument("--dimension", type=int, default=384, help="Synthetic vector dimension")
+    ann_parser.add_argument("--db", help="Use the vectors of a saved flat index instead of synthetic ones")
+    ann_parser.add_argument("--factories", nargs="+",
+                            default=["Flat", "IVF1024,Flat", "IVF1024,PQ48", "HNSW32"])
+    ann_parser.add_argument("--queries", type=int, default=1000)
+    ann_parser.add_argument("--top-k", type=int, default=Config.TOP_K_RETRIEVAL)
+    ann_parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 16, 64])
+    ann_parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    ann_parser.add_argument("--train-size", type=int, default=Config.INDEX_TRAIN_SIZE)
+
+    storage_parser = subparsers.add_parser("storage", help="Recall and size of vector storage modes "
+                                                           "against full-precision flat search")
+    storage_parser.add_argument("--vectors", type=int, default=100000, help="Synthetic corpus size")
+    storage_parser.add_argument("--dimension", type=int, default=384, help="Synthetic vector dimension")
+    storage_parser.add_argument("--db", help="Use the vectors of a saved flat index instead of synthetic ones")
+    storage_parser.add_argument("--index", default=Config.INDEX_FACTORY, help="Index type the modes are applied to")
+    storage_parser.add_argument("--storage", nargs="+", default=["float32", "float16", "sq8"])
+    storage_parser.add_argument("--pca", type=int, nargs="+", default=[0, 128], help="PCA dimensions; 0 for none")
+    storage_parser.add_argument("--queries", type=int, default=1000)
+    storage_parser.add_argument("--top-k", type=int, default=Config.TOP_K_RETRIEVAL)
+    storage_parser.add_argument("--train-size", type=int, default=Config.INDEX_TRAIN_SIZE)
+
+    embeddings_parser = subparsers.add_parser("embeddings", help="Embedding backend parity with PyTorch "
+                                                                 "and single-query / batch speed")
+    embeddings_parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"])
+    embeddings_parser.add_argument("--db", default=Config.VECTOR_DB_PATH, help="Take sample texts from this index")
+    embeddings_parser.add_argument("--texts", type=int, default=256, help="Number of sample texts")
+    embeddings_parser.add_argument("--threshold", type=float, default=Config.EMBEDDING_PARITY_THRESHOLD)
+    embeddings_parser.add_argument("--batch-size", type=int, default=32)
+
+    workers_parser = subparsers.add_parser("embedding-workers", help="Index build embedding throughput "
+                                                                     "per number of worker processes")
+    workers_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    workers_parser.add_argument("--db", default=Config.VECTOR_DB_PATH, help="Take sample texts from this index")
+    workers_parser.add_argument("--texts", type=int, default=2048, help="Number of sample texts")
+    workers_parser.add_argument("--batch-size", type=int, default=Config.EMBEDDING_BATCH_SIZE)
+
+    startup_parser = subparsers.add_parser("startup", help="Import, initialization and first-query time "
+                                                           "of a fresh process")
+    startup_parser.add_argument("--query", default="সংবিধানের ২৭ অনুচ্ছেদে কী বলা হয়েছে?")
+    startup_parser.add_argument("--runs", type=int, default=5)
+
+    routing_parser = subparsers.add_parser("routing", help="Recall and latency of two-stage document routing "
+                                                           "against exhaustive search")
+    routing_parser.add_argument("--db", default=Config.VECTOR_DB_PATH, help="Saved index to search")
+    routing_parser.add_argument("--documents", type=int, nargs="+", default=[1, 2, 3, 5],
+                                help="Documents each question is routed to")
+    routing_parser.add_argument("--questions", help="File with one question per line; by default the "
+                                                    "built-in questions plus the openings of sampled chunks")
+    routing_parser.add_argument("--queries", type=int, default=200, help="Chunks sampled as questions")
+    routing_parser.add_argument("--top-k", type=int, default=Config.TOP_K_RETRIEVAL)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "pdf-backends":
+        benchmark_pdf_backends(args.data, args.backends)
+    elif args.benchmark == "ann":
+        vectors = _load_index_vectors(args.db) if args.db else _synthetic_vectors(args.vectors, args.dimension)
+        benchmark_ann(vectors, args.factories, args.queries, args.top_k,
+                      args.nprobe, args.ef_search, args.train_size)
+    elif args.benchmark == "embeddings":
+        texts = _sample_texts(args.db, args.texts)
+        if not benchmark_embeddings(args.backends, texts, args.threshold, args.batch_size):
+            raise SystemExit(1)
+    elif args.benchmark == "embedding-workers":
+        benchmark_embedding_workers(_sample_texts(args.db, args.texts), args.workers, args.batch_size)
+    elif args.benchmark == "startup":
+        benchmark_startup(args.query, args.runs)
+    elif args.benchmark == "routing":
+        if args.questions:
+            with open(args.questions, 'r', encoding='utf-8') as f:
+                questions = [line.strip() for line in f if line.strip()]
+        else:
+            questions = list(_LEGAL_SENTENCES) + [text[:100] for text in _sample_texts(args.db, args.queries)]
+        benchmark_routing(args.db, questions, args.documents, args.top_k)
+    elif args.benchmark == "storage":
+        from vector_database import compose_index_factory
+
+        vectors = _load_index_vectors(args.db) if args.db else _synthetic_vectors(args.vectors, args.dimension)
+        factories = [compose_index_factory(args.index, storage, pca_dim)
+                     for pca_dim in args.pca for storage in args.storage]
+        benchmark_ann(vectors, factories, args.queries, args.top_k,
+                      [Config.INDEX_NPROBE], [Config.INDEX_EF_SEARCH], args.train_size)
+
+if __name__ == "__main__":
+    main()
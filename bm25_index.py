@@ -0,0 +1,171 @@
+import re
+import json
+import math
+import unicodedata
+import numpy as np
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+from chunk_store import _replace_atomically
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_BENGALI_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+
+# Digit runs, or runs of letters including Bengali vowel signs and virama (not \w in Python)
+_TOKEN_PATTERN = re.compile(r"[0-9]+|(?:[^\W\d_]|[ঀ-৥ৰ-৿])+")
+
+# Common Bengali inflections, longest first, so "ধারায়" and "ধারার" both match "ধারা"
+_SUFFIXES = tuple(sorted((unicodedata.normalize("NFC", suffix) for suffix in
+                          ("গুলোর", "গুলো", "দের", "য়ের", "ের", "এর", "কে", "তে", "য়", "র", "টি", "টা")),
+                         key=len, reverse=True))
+
+# File names inside the vector database directory
+BM25_OFFSETS_FILE = "bm25_offsets.npy"
+BM25_ROWS_FILE = "bm25_rows.npy"
+BM25_TF_FILE = "bm25_tf.npy"
+BM25_LENGTHS_FILE = "bm25_lengths.npy"
+BM25_VOCAB_FILE = "bm25_vocab.json"
+
+def tokenize_bengali(text: str) -> List[str]:
+    """
+    Split text into lexical search terms
+
+    Normalizes Unicode (NFC) and Bengali digits to ASCII, folds case, splits
+    digits from letters and strips common Bengali inflectional suffixes.
+    """
+    text = unicodedata.normalize("NFC", text).translate(_BENGALI_DIGITS).casefold()
+    return [_stem(token) for token in _TOKEN_PATTERN.findall(text)]
+
+def _stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            return token[:-len(suffix)]
+    return token
+
+class BM25Index:
+    """
+    BM25 inverted index over chunk texts
+
+    Postings are kept in compressed sparse row form: for term id t, rows and term
+    frequencies live at offsets[t]:offsets[t + 1]. Scoring a query only touches the
+    postings of its terms, and the arrays can be memory-mapped from disk.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, rows: np.ndarray,
+                 term_frequencies: np.ndarray, lengths: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.rows = rows
+        self.term_frequencies = term_frequencies
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Tokenize every text and build the postings
+        """
+        vocabulary = {}
+        term_ids = array('i')
+        rows = array('i')
+        frequencies = array('f')
+        lengths = array('f')
+
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize_bengali(text))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                frequencies.append(count)
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')  # Keeps each term's rows ascending
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+
+        return cls(vocabulary, offsets, np.frombuffer(rows, dtype=np.int32)[order],
+                   np.frombuffer(frequencies, dtype=np.float32)[order],
+                   np.frombuffer(lengths, dtype=np.float32).copy(), k1, b)
+
+    def search(self, terms: List[str], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, scores) of the top_k chunks by BM25 score for the given terms
+        """
+        row_parts = []
+        score_parts = []
+        for term in set(terms):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            rows = self.rows[start:end]
+            frequencies = self.term_frequencies[start:end]
+            idf = math.log(1 + (len(self) - (end - start) + 0.5) / (end - start + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / self.average_length)
+            row_parts.append(rows)
+            score_parts.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+
+        if not row_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        rows, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if len(rows) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(rows))
+        best = best[np.lexsort((rows[best], -scores[best]))]
+        return rows[best].astype(np.int64), scores[best]
+
+    def is_keyword_query(self, terms: List[str], max_terms: int = 3) -> bool:
+        """
+        Whether a query is a short lookup of indexed terms, such as "৪২০ ধারা"
+
+        Such queries are answered from the postings alone: a few terms, all in the
+        vocabulary, with either a number among them or a single term.
+        """
+        if not terms or len(terms) > max_terms or any(term not in self.vocabulary for term in terms):
+            return False
+        return len(terms) == 1 or any(term.isdigit() for term in terms)
+
+    def save(self, db_path: Path) -> None:
+        """
+        Write the postings next to the vector index
+        """
+        for name, values in ((BM25_OFFSETS_FILE, self.offsets), (BM25_ROWS_FILE, self.rows),
+                             (BM25_TF_FILE, self.term_frequencies), (BM25_LENGTHS_FILE, self.lengths)):
+            _replace_atomically(db_path / name, lambda f, values=values: np.save(f, values))
+
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        vocab = json.dumps({'terms': terms, 'k1': self.k1, 'b': self.b}, ensure_ascii=False)
+        _replace_atomically(db_path / BM25_VOCAB_FILE, lambda f: f.write(vocab.encode('utf-8')))
+
+    @classmethod
+    def load(cls, db_path: Path, use_mmap: bool = True) -> Optional["BM25Index"]:
+        """
+        Read saved postings, memory-mapping the arrays with use_mmap; None if there are none
+        """
+        names = (BM25_OFFSETS_FILE, BM25_ROWS_FILE, BM25_TF_FILE, BM25_LENGTHS_FILE, BM25_VOCAB_FILE)
+        if not all((db_path / name).exists() for name in names):
+            return None
+
+        mmap_mode = 'r' if use_mmap else None
+        with open(db_path / BM25_VOCAB_FILE, 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        return cls({term: i for i, term in enumerate(vocab['terms'])},
+                   np.load(db_path / BM25_OFFSETS_FILE, mmap_mode=mmap_mode),
+                   np.load(db_path / BM25_ROWS_FILE, mmap_mode=mmap_mode),
+                   np.load(db_path / BM25_TF_FILE, mmap_mode=mmap_mode),
+                   np.load(db_path / BM25_LENGTHS_FILE, mmap_mode=mmap_mode),
+                   vocab['k1'], vocab['b'])
@@ -0,0 +1,150 @@
+import os
+import json
+import mmap
+import numpy as np
+from collections.abc import Sequence
+from typing import Dict, List
+from pathlib import Path
+
+# Fixed-width metadata table; -1 marks a field a chunk does not have
+METADATA_DTYPE = np.dtype([
+    ('document', '<i4'),
+    ('chunk_index', '<i4'),
+    ('total_chunks', '<i4'),
+    ('page_start', '<i4'),
+    ('page_end', '<i4'),
+    ('char_start', '<i8'),
+    ('char_end', '<i8'),
+])
+_INT_FIELDS = METADATA_DTYPE.names[1:]
+
+# File names inside the vector database directory
+CHUNK_BLOB_FILE = "chunks.bin"
+CHUNK_OFFSETS_FILE = "chunk_offsets.npy"
+METADATA_TABLE_FILE = "metadata.npy"
+METADATA_EXTRA_FILE = "metadata_extra.json"
+
+def _replace_atomically(path: Path, write) -> None:
+    """
+    Write a file through a temporary sibling so readers never see it half-written
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def write_chunk_store(db_path: Path, chunks: Sequence, metadata: Sequence) -> None:
+    """
+    Save chunks as one UTF-8 blob plus an offsets array, and metadata as a fixed-width table
+
+    Document names and any fields the table has no column for (such as the
+    near-duplicate 'duplicates' lists) go to a small JSON sidecar.
+    """
+    offsets = np.zeros(len(chunks) + 1, dtype='<i8')
+
+    def write_blob(f) -> None:
+        position = 0
+        for i, text in enumerate(chunks):
+            data = text.encode('utf-8')
+            f.write(data)
+            position += len(data)
+            offsets[i + 1] = position
+
+    _replace_atomically(db_path / CHUNK_BLOB_FILE, write_blob)
+    _replace_atomically(db_path / CHUNK_OFFSETS_FILE, lambda f: np.save(f, offsets))
+
+    documents = {}
+    table = np.full(len(metadata), -1, dtype=METADATA_DTYPE)
+    extra = {}
+    for i, entry in enumerate(metadata):
+        table['document'][i] = documents.setdefault(entry['document'], len(documents))
+        for field in _INT_FIELDS:
+            value = entry.get(field)
+            if value is not None:
+                table[field][i] = value
+        row_extra = {key: value for key, value in entry.items() if key not in METADATA_DTYPE.names}
+        if row_extra:
+            extra[str(i)] = row_extra
+
+    _replace_atomically(db_path / METADATA_TABLE_FILE, lambda f: np.save(f, table))
+    sidecar = json.dumps({'documents': list(documents), 'extra': extra}, ensure_ascii=False)
+    _replace_atomically(db_path / METADATA_EXTRA_FILE, lambda f: f.write(sidecar.encode('utf-8')))
+
+def chunk_store_exists(db_path: Path) -> bool:
+    """
+    Whether a complete chunk store has been written to db_path
+    """
+    return all((db_path / name).exists()
+               for name in (CHUNK_BLOB_FILE, CHUNK_OFFSETS_FILE, METADATA_TABLE_FILE, METADATA_EXTRA_FILE))
+
+class MappedChunks(Sequence):
+    """
+    Read-only, memory-mapped view of the chunk texts
+
+    Texts are decoded from the mapped blob on access, so opening the store costs
+    nothing up front and processes reading the same store share its pages.
+    """
+
+    def __init__(self, db_path: Path):
+        self._offsets = np.load(db_path / CHUNK_OFFSETS_FILE, mmap_mode='r')
+        with open(db_path / CHUNK_BLOB_FILE, 'rb') as f:
+            # mmap cannot map an empty file
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return self._blob[int(self._offsets[index]):int(self._offsets[index + 1])].decode('utf-8')
+
+class MappedMetadata(Sequence):
+    """
+    Read-only, memory-mapped view of the chunk metadata
+
+    Rows are turned into the same dicts build_index produces on access.
+    """
+
+    def __init__(self, db_path: Path):
+        self._table = np.load(db_path / METADATA_TABLE_FILE, mmap_mode='r')
+        with open(db_path / METADATA_EXTRA_FILE, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        self.documents: List[str] = sidecar['documents']
+        self._extra: Dict[str, Dict] = sidecar['extra']
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("metadata index out of range")
+
+        row = self._table[index]
+        metadata = {'document': self.documents[row['document']]}
+        for field in _INT_FIELDS:
+            value = int(row[field])
+            if value != -1:
+                metadata[field] = value
+        metadata.update(self._extra.get(str(index), {}))
+        return metadata
+
+    def rows_with_duplicates(self) -> List[int]:
+        """
+        Rows that carry a non-empty 'duplicates' list
+        """
+        return [int(row) for row, extra in self._extra.items() if extra.get('duplicates')]
+
+    def document_rows(self) -> np.ndarray:
+        """
+        Document id of every row, as an index into self.documents
+        """
+        return self._table['document']
@@ -11,16 +11,104 @@ class Config:
     TEMPERATURE = 0.7
     
     # RAG Configuration
-    CHUNK_SIZE = 1000
+    CHUNK_UNIT = "tokens"  # "tokens" (embedding tokenizer) or "chars"
+    CHUNK_SIZE = 1000  # Characters, used when CHUNK_UNIT = "chars"
     CHUNK_OVERLAP = 200
+    CHUNK_SIZE_TOKENS = 0  # 0 uses the embedding model's max sequence length
+    CHUNK_OVERLAP_TOKENS = 24
     TOP_K_RETRIEVAL = 5
+    # Context sent to Gemini: up to CONTEXT_CANDIDATES chunks are cut at the first score
+    # drop above CONTEXT_SCORE_GAP (share of their score range), near-duplicates dropped,
+    # overlapping / consecutive chunks merged, and passages added best first until the
+    # estimated CONTEXT_TOKEN_BUDGET is used. A section cited in the question is quoted
+    # first, cut to at most CONTEXT_CITATION_SHARE of the budget
+    CONTEXT_CANDIDATES = 10
+    CONTEXT_TOKEN_BUDGET = 1000
+    CONTEXT_MIN_PASSAGES = 2
+    CONTEXT_SCORE_GAP = 0.3
+    CONTEXT_CITATION_SHARE = 0.5
     
     # Vector Database
     EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    # "sentence-transformers" (PyTorch), "onnx" (ONNX Runtime) or "onnx-int8" (dynamically quantized);
+    # check parity and speed with: python benchmark.py embeddings
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+    ONNX_MODEL_PATH = "./onnx_models"  # Exported ONNX models and their tokenizers
+    EMBEDDING_THREADS = 0  # ONNX Runtime intra-op threads; 0 lets it decide
+    EMBEDDING_PARITY_THRESHOLD = 0.99  # Minimum cosine to the PyTorch embeddings
+    # The model loads on first use; warm-up loads it in the background once a saved
+    # index is up. Measure startup with: python benchmark.py startup
+    EMBEDDING_WARMUP = True
+    # Processes embedding chunks during index builds, each with its own model copy and
+    # EMBEDDING_THREADS threads (0 divides the cores); 1 embeds in-process. Keep
+    # INDEX_BATCH_SIZE at several encoder batches per worker so every worker is busy.
+    # Measure scaling with: python benchmark.py embedding-workers
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 1))
+    EMBEDDING_BATCH_SIZE = 32  # Texts per encoder batch; build batches group texts of similar length
     VECTOR_DB_PATH = "./vector_db"
+    INDEX_BATCH_SIZE = 256  # Chunks embedded and added to the index per batch
+    INDEX_KEEP_SNAPSHOTS = 3  # Saved index snapshots kept in VECTOR_DB_PATH/snapshots
+    INDEX_VERIFY_SNAPSHOTS = True  # Checksum older snapshots before falling back to them when a load fails
+    INDEX_RELOAD_INTERVAL = 5  # Seconds between checks for a newer snapshot while serving; 0 disables
+    # Split the corpus across INDEX_SHARDS indexes searched in parallel; 1 keeps a single index.
+    # With SHARD_ADDRESSES ("127.0.0.1:6100,127.0.0.1:6101,...") searches go to shard server
+    # processes started with: python run.py shards. Shard connections carry pickled data, so
+    # both sides refuse to run without a secret SHARD_AUTHKEY; servers listen on localhost
+    # unless SHARD_HOST is changed.
+    INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", 1))
+    SHARD_ADDRESSES = [(host, int(port)) for host, port in
+                       (address.strip().rsplit(":", 1) for address in os.getenv("SHARD_ADDRESSES", "").split(",")
+                        if address.strip())]
+    SHARD_HOST = "127.0.0.1"
+    SHARD_BASE_PORT = 6100  # Shard i listens on SHARD_BASE_PORT + i
+    SHARD_AUTHKEY = os.getenv("SHARD_AUTHKEY", "")
+    EMBEDDING_CACHE_PATH = "./embedding_cache"  # Chunk embeddings per model and text hash; None disables the cache
+    
+    # FAISS index type as a factory string; "Flat" is exact. For ~10k-1M chunks try
+    # "IVF{4*sqrt(N)},Flat", "IVF{4*sqrt(N)},PQ48" (smaller) or "HNSW32" and compare
+    # recall/latency with: python benchmark.py ann
+    INDEX_FACTORY = "Flat"
+    INDEX_STORAGE = "float32"  # "float16" or "sq8" (8-bit scalar quantization) to shrink resident vectors
+    INDEX_PCA_DIM = 0  # Project embeddings to this many dimensions with PCA; 0 keeps them all
+    INDEX_TRAIN_SIZE = 50000  # Vectors sampled at random from a build to train IVF/PQ indexes
+    INDEX_NPROBE = 16  # IVF lists scanned per query
+    INDEX_EF_SEARCH = 64  # HNSW search breadth
+    
+    # Retrieval: "dense" (embeddings) or "hybrid" (BM25 keywords fused with embeddings)
+    RETRIEVAL_MODE = "hybrid"
+    RRF_K = 60  # Reciprocal rank fusion constant
+    HYBRID_CANDIDATES = 50  # Results taken from each retriever before fusion
+    # Two-stage dense search: route each question to this many documents by their
+    # per-document and per-section routing vectors, then search only their chunks;
+    # 0 searches every chunk. Measure recall/latency with: python benchmark.py routing
+    ROUTE_DOCUMENTS = 0
+    
+    # Query embeddings and search results per normalized question
+    QUERY_CACHE_SIZE = 1024  # Entries; 0 disables the cache
+    QUERY_CACHE_TTL = 3600  # Seconds
+    
+    # Near-duplicate chunk merging (MinHash/LSH over character shingles)
+    DEDUP_ENABLED = True
+    DEDUP_THRESHOLD = 0.85  # Estimated Jaccard similarity at which chunks are merged
+    DEDUP_NUM_PERM = 64
+    DEDUP_BANDS = 16
+    DEDUP_SHINGLE_SIZE = 5
     
     # PDF Processing
     PDF_DATA_PATH = "./data"
+    PDF_BACKEND = "pypdf2"  # Text extractor: "pypdf2", "pdfium" or "pdfminer" (see pdf_backends.py)
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))  # 1 disables the process pool
+    PDF_PAGES_PER_SHARD = 20  # Pages extracted per worker task
+    TEXT_CACHE_PATH = "./text_cache"  # Cleaned text per PDF content hash; None disables the cache
+    
+    # OCR fallback for scanned or garbled pages (needs pytesseract, pypdfium2 and tesseract-ocr-ben)
+    OCR_ENABLED = os.getenv("OCR_ENABLED", "").lower() in ("1", "true", "yes")
+    OCR_LANGUAGE = "ben+eng"
+    OCR_DPI = 300
+    OCR_WORKERS = PDF_WORKERS
+    OCR_MIN_CHARS = 30  # Pages with less extracted text are OCRed
+    OCR_MIN_BENGALI_RATIO = 0.2  # Pages whose text is less Bengali than this are OCRed
+    OCR_CACHE_PATH = "./text_cache/ocr"  # OCR text per rendered page image hash
     
     # Bengali Language Support
     LANGUAGE = "bn"
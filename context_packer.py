@@ -0,0 +1,170 @@
+import re
+from typing import Dict, List, Optional
+from dedup import NearDuplicateIndex
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rough characters per prompt token: Bengali script splits into many more tokens
+# per character than Latin text. Estimates err high so the budget holds.
+_BENGALI_CHARS_PER_TOKEN = 2.5
+_OTHER_CHARS_PER_TOKEN = 4.0
+_BENGALI_PATTERN = re.compile(r"[ঀ-৿]")
+
+# Tokens of the "=== document (location) [score] ===" line above each passage
+_HEADER_TOKENS = 16
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate prompt token count of a text, without calling a tokenizer
+    """
+    bengali = len(_BENGALI_PATTERN.findall(text))
+    other = len(text) - bengali - text.count(" ")
+    return int(bengali / _BENGALI_CHARS_PER_TOKEN + other / _OTHER_CHARS_PER_TOKEN) + 1
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """
+    The longest sentence-ending prefix of text within about tokens estimated tokens
+    """
+    if tokens <= 0:
+        return ""
+    length = len(text)
+    while length > 0 and estimate_tokens(text[:length]) > tokens:
+        length = int(length * 0.9)
+    prefix = text[:length]
+    sentence_end = max(prefix.rfind(mark) for mark in "।৷!?")
+    return prefix[:sentence_end + 1] if sentence_end > 0 else prefix
+
+def ranking_score(result: Dict) -> float:
+    """
+    The value a result was ranked by: the fused score of hybrid results, else 'score'
+    """
+    return result.get('fused_score', result['score'])
+
+class ContextPacker:
+    """
+    Assembles retrieved chunks into as few, non-repeating passages as fit a token budget
+
+    Candidates (best first) are cut at the first sharp score drop, so a clear
+    winner is not padded with weak matches. Chunks that nearly duplicate a kept
+    one are dropped. Chunks of the same document that overlap or follow each
+    other are merged into one passage, with the overlap included once. Passages
+    are then taken best first while the estimated tokens fit token_budget;
+    passages up to min_passages are shortened to fit rather than left out.
+    """
+
+    def __init__(self, token_budget: int = 1000, min_passages: int = 2, score_gap: float = 0.3,
+                 duplicate_threshold: float = 0.85, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        self.token_budget = token_budget
+        self.min_passages = min_passages
+        self.score_gap = score_gap
+        self.duplicate_threshold = duplicate_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+
+    def select(self, results: List[Dict]) -> List[Dict]:
+        """
+        The leading results up to the first drop larger than score_gap of the results' score range
+        
+        Scores are the ones the results were ranked by (see ranking_score).
+        """
+        if len(results) <= self.min_passages:
+            return list(results)
+
+        scores = [ranking_score(result) for result in results]
+        score_range = scores[0] - min(scores)
+        if score_range <= 0:
+            return list(results)
+
+        for i in range(max(self.min_passages, 1), len(results)):
+            if (scores[i - 1] - scores[i]) / score_range > self.score_gap:
+                return results[:i]
+        return list(results)
+
+    def drop_duplicates(self, results: List[Dict]) -> List[Dict]:
+        """
+        Results whose text does not nearly duplicate a better-scored result's
+        """
+        deduplicator = NearDuplicateIndex(self.duplicate_threshold, self.num_perm, self.bands, self.shingle_size)
+        return [result for i, result in enumerate(results) if deduplicator.find_or_insert(i, result['text']) is None]
+
+    @staticmethod
+    def merge_neighbours(results: List[Dict]) -> List[Dict]:
+        """
+        Merge chunks of one document that overlap or are consecutive into passages
+
+        A passage keeps the best scores of its chunks, lists them in 'chunk_indices'
+        and spans their pages. Returned best first.
+        """
+        by_document = {}
+        for result in results:
+            by_document.setdefault(result['document'], []).append(result)
+
+        passages = []
+        for document, chunks in by_document.items():
+            chunks.sort(key=lambda result: (result['metadata'].get('char_start', 0), result['chunk_index']))
+            passage = None
+            for chunk in chunks:
+                metadata = chunk['metadata']
+                start, end = metadata.get('char_start'), metadata.get('char_end')
+                if passage is not None:
+                    last_end = passage['metadata'].get('char_end')
+                    overlaps = start is not None and last_end is not None and start <= last_end
+                    if overlaps or chunk['chunk_index'] == passage['chunk_indices'][-1] + 1:
+                        if overlaps:
+                            if end is not None and end > last_end:
+                                passage['text'] += chunk['text'][last_end - start:]
+                        else:
+                            passage['text'] += " " + chunk['text']
+                        if chunk['score'] is not None:  # None for keyword lookups in hybrid mode
+                            passage['score'] = max(passage['score'], chunk['score'])
+                        if 'fused_score' in chunk:
+                            passage['fused_score'] = max(passage.get('fused_score', 0.0), chunk['fused_score'])
+                        passage['chunk_indices'].append(chunk['chunk_index'])
+                        merged = passage['metadata']
+                        if end is not None and last_end is not None:
+                            merged['char_end'] = max(last_end, end)
+                        if metadata.get('page_end'):
+                            merged['page_end'] = max(merged.get('page_end') or 0, metadata['page_end'])
+                        continue
+                    passages.append(passage)
+
+                passage = dict(chunk)
+                passage['metadata'] = dict(metadata)
+                passage['chunk_indices'] = [chunk['chunk_index']]
+            passages.append(passage)
+
+        passages.sort(key=lambda passage: -ranking_score(passage))
+        return passages
+
+    def pack(self, results: List[Dict], token_budget: Optional[int] = None) -> List[Dict]:
+        """
+        Passages for the prompt from results ordered best first, within token_budget estimated tokens
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        passages = self.merge_neighbours(self.drop_duplicates(self.select(results)))
+
+        packed = []
+        used = 0
+        for passage in passages:
+            cost = estimate_tokens(passage['text'] + passage['document']) + _HEADER_TOKENS
+            if used + cost > budget:
+                if len(packed) >= self.min_passages:
+                    continue  # A smaller passage further down may still fit
+                # Until min_passages are packed, each passage that does not fit keeps its
+                # opening, cut at a sentence end, within an equal share of what is left
+                share = (budget - used) // (self.min_passages - len(packed))
+                passage['text'] = truncate_to_tokens(passage['text'], share - _HEADER_TOKENS)
+                if not passage['text']:
+                    break
+                cost = min(share, estimate_tokens(passage['text'] + passage['document']) + _HEADER_TOKENS)
+            packed.append(passage)
+            used += cost
+
+        for rank, passage in enumerate(packed, 1):
+            passage['rank'] = rank
+        logger.info(f"Packed {len(results)} results into {len(packed)} passages, ~{used} tokens")
+        return packed
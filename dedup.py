@@ -0,0 +1,87 @@
+import zlib
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Mersenne prime for the universal hash family used to simulate permutations
+_PRIME = (1 << 31) - 1
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index for spotting near-duplicate chunks
+
+    Every text is reduced to a MinHash signature over its character shingles.
+    Signatures are split into bands and bucketed, so only texts sharing at least
+    one band are compared; a candidate counts as a duplicate when the estimated
+    Jaccard similarity of the two shingle sets reaches the threshold.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        rng = np.random.RandomState(seed)
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text's whitespace-normalized character shingles
+        """
+        text = " ".join(text.split())
+        size = self.shingle_size
+        shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def query(self, signature: np.ndarray) -> Optional[int]:
+        """
+        Key of the most similar indexed text at or above the threshold, if any
+        """
+        best_key, best_similarity = None, self.threshold
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self._buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                similarity = float(np.mean(self._signatures[key] == signature))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+        return best_key
+
+    def insert(self, key: int, signature: np.ndarray) -> None:
+        """
+        Index a signature under key
+        """
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def find_or_insert(self, key: int, text: str) -> Optional[int]:
+        """
+        Return the key of a near-duplicate of text, or index text under key and return None
+        """
+        signature = self.signature(text)
+        duplicate_of = self.query(signature)
+        if duplicate_of is None:
+            self.insert(key, signature)
+        return duplicate_of
@@ -0,0 +1,113 @@
+import json
+import numpy as np
+from typing import Callable, Iterable, List, Optional, Tuple
+from pathlib import Path
+from chunk_store import _replace_atomically
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File names inside the vector database directory
+ROUTING_VECTORS_FILE = "routing_vectors.npy"
+ROUTING_UNITS_FILE = "routing_units.json"
+
+# Routing unit: (document, section label or None for the whole document, index rows)
+RoutingUnit = Tuple[str, Optional[str], np.ndarray]
+
+class DocumentRouter:
+    """
+    Routing vectors for two-stage (coarse-to-fine) search
+
+    Every document gets the normalized mean of its chunk embeddings, and every
+    section in the section table the mean of the chunks overlapping it. A query
+    is first scored against these few vectors; a document scores as its best
+    unit, so a question about one section of a long act still reaches that act.
+    Chunk-level search then only considers the best-scoring documents.
+    """
+
+    def __init__(self, vectors: np.ndarray, documents: List[str], unit_documents: np.ndarray,
+                 labels: List[Optional[str]], row_count: int):
+        self.vectors = vectors
+        self.documents = documents
+        self.unit_documents = unit_documents  # Position in documents of each unit
+        self.labels = labels
+        self.row_count = row_count  # Index rows the vectors were built from
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @classmethod
+    def build(cls, units: Iterable[RoutingUnit], row_vectors: Callable[[np.ndarray], np.ndarray],
+              row_count: int, block_size: int = 4096) -> "DocumentRouter":
+        """
+        Average the index vectors of every unit's rows, reading at most block_size rows at a time
+        """
+        documents = {}
+        vectors = []
+        unit_documents = []
+        labels = []
+        for document, label, rows in units:
+            total = None
+            for start in range(0, len(rows), block_size):
+                block = row_vectors(rows[start:start + block_size]).sum(axis=0, dtype=np.float64)
+                total = block if total is None else total + block
+            if total is None:
+                continue
+            norm = np.linalg.norm(total)
+            vectors.append((total / norm if norm else total).astype(np.float32))
+            unit_documents.append(documents.setdefault(document, len(documents)))
+            labels.append(label)
+
+        dimension = vectors[0].shape[0] if vectors else 0
+        return cls(np.vstack(vectors) if vectors else np.zeros((0, dimension), dtype=np.float32),
+                   list(documents), np.array(unit_documents, dtype=np.int32), labels, row_count)
+
+    def document_scores(self, query_vectors: np.ndarray) -> np.ndarray:
+        """
+        Routing score of every document for every query (queries x documents)
+        """
+        unit_scores = query_vectors @ self.vectors.T
+        scores = np.full((len(query_vectors), len(self.documents)), -np.inf, dtype=np.float32)
+        np.maximum.at(scores.T, self.unit_documents, unit_scores.T)
+        return scores
+
+    def route(self, query_vectors: np.ndarray, count: int) -> List[List[str]]:
+        """
+        Names of the count best documents for every query, best first
+        """
+        scores = self.document_scores(query_vectors)
+        if count >= len(self.documents):
+            best = np.argsort(-scores, axis=1, kind='stable')
+        else:
+            best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+            best = np.take_along_axis(best, np.argsort(-np.take_along_axis(scores, best, axis=1),
+                                                       axis=1, kind='stable'), axis=1)
+        return [[self.documents[i] for i in query_best] for query_best in best]
+
+    def save(self, db_path: Path) -> None:
+        """
+        Write the routing vectors next to the vector index
+        """
+        _replace_atomically(db_path / ROUTING_VECTORS_FILE, lambda f: np.save(f, self.vectors))
+        units = json.dumps({
+            'documents': self.documents,
+            'unit_documents': self.unit_documents.tolist(),
+            'labels': self.labels,
+            'row_count': self.row_count
+        }, ensure_ascii=False)
+        _replace_atomically(db_path / ROUTING_UNITS_FILE, lambda f: f.write(units.encode('utf-8')))
+
+    @classmethod
+    def load(cls, db_path: Path) -> Optional["DocumentRouter"]:
+        """
+        Read saved routing vectors; None if there are none
+        """
+        if not ((db_path / ROUTING_VECTORS_FILE).exists() and (db_path / ROUTING_UNITS_FILE).exists()):
+            return None
+
+        with open(db_path / ROUTING_UNITS_FILE, 'r', encoding='utf-8') as f:
+            units = json.load(f)
+        return cls(np.load(db_path / ROUTING_VECTORS_FILE), units['documents'],
+                   np.array(units['unit_documents'], dtype=np.int32), units['labels'], units['row_count'])
@@ -0,0 +1,353 @@
+import os
+import re
+import sys
+import json
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Type
+from pathlib import Path
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EmbeddingBackend:
+    """
+    Interface for the sentence embedding runtimes used by LegalVectorDatabase
+
+    Backends expose the parts of SentenceTransformer the rest of the system uses:
+    encode(), tokenizer (a fast Hugging Face tokenizer, for token-aware chunking)
+    and max_seq_length.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def embedding_id(self) -> str:
+        """
+        Identifies the vectors this backend produces; keys the embedding cache
+        """
+        return embedding_id(self.name, self.model_name)
+
+    @property
+    def tokenizer(self):
+        raise NotImplementedError
+
+    @property
+    def max_seq_length(self) -> int:
+        raise NotImplementedError
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Embed texts as a float32 (len(texts), dimension) matrix
+        """
+        raise NotImplementedError
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    The reference PyTorch implementation through sentence-transformers
+    """
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.model.max_seq_length
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar).astype('float32')
+
+class ONNXBackend(EmbeddingBackend):
+    """
+    The same model exported to ONNX and run with ONNX Runtime, without PyTorch
+
+    The transformer is exported once (which does need sentence-transformers and
+    PyTorch) into onnx_path together with its tokenizer and pooling settings;
+    later runs only load ONNX Runtime and the tokenizer. With quantize=True the
+    weights are dynamically quantized to int8, which is smaller and usually
+    faster on CPUs at a small accuracy cost.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, onnx_path: str = "./onnx_models", quantize: bool = False,
+                 threads: int = 0):
+        super().__init__(model_name)
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("The 'onnx' embedding backend requires onnxruntime and transformers: "
+                              "pip install onnxruntime transformers") from e
+
+        self.quantize = quantize
+        self.model_dir = Path(onnx_path) / re.sub(r'[^\w.-]+', '_', model_name)
+        model_file = self.model_dir / ("model-int8.onnx" if quantize else "model.onnx")
+        if not model_file.exists():
+            export_onnx_model(model_name, self.model_dir, quantize=quantize)
+
+        with open(self.model_dir / "pooling.json", 'r', encoding='utf-8') as f:
+            self.pooling = json.load(f)
+        self._tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model {model_file}")
+
+    @property
+    def embedding_id(self) -> str:
+        return embedding_id("onnx-int8" if self.quantize else "onnx", self.model_name)
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.pooling['max_seq_length']
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.pooling['dimension']), dtype='float32')
+        # Batch texts of similar length together so little of each batch is padding
+        order = np.argsort([len(text) for text in texts], kind='stable')
+
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = self._tokenizer([texts[i] for i in batch], padding=True, truncation=True,
+                                     max_length=self.max_seq_length, return_tensors="np")
+            feeds = {name: values.astype('int64') for name, values in inputs.items() if name in self._input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            if self.pooling['mode'] == "cls":
+                pooled = token_embeddings[:, 0]
+            else:
+                mask = inputs['attention_mask'][..., None].astype('float32')
+                pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if self.pooling['normalize']:
+                pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            embeddings[batch] = pooled
+
+        return embeddings
+
+def export_onnx_model(model_name: str, model_dir: Path, quantize: bool = False) -> None:
+    """
+    Export a sentence-transformers model's transformer to ONNX, optionally int8-quantized
+
+    Writes model.onnx (and model-int8.onnx), the tokenizer files and pooling.json
+    with the pooling mode, normalization, max_seq_length and dimension.
+    """
+    model_dir.mkdir(parents=True, exist_ok=True)
+    model_file = model_dir / "model.onnx"
+
+    if not model_file.exists():
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Exporting {model_name} to ONNX...")
+        model = SentenceTransformer(model_name, device="cpu")
+        transformer = model[0].auto_model.eval()
+        pooling = next((module for module in model if type(module).__name__ == "Pooling"), None)
+
+        class TokenEmbeddings(torch.nn.Module):
+            def __init__(self, transformer):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, input_ids, attention_mask):
+                return self.transformer(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+        sample = model.tokenizer(["নমুনা বাক্য", "sample sentence"], padding=True, return_tensors="pt")
+        tmp_file = model_file.with_suffix('.tmp')
+        torch.onnx.export(
+            TokenEmbeddings(transformer), (sample['input_ids'], sample['attention_mask']), str(tmp_file),
+            input_names=["input_ids", "attention_mask"], output_names=["token_embeddings"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"},
+                          "token_embeddings": {0: "batch", 1: "sequence"}},
+            opset_version=14)
+        os.replace(tmp_file, model_file)
+
+        model.tokenizer.save_pretrained(str(model_dir))
+        with open(model_dir / "pooling.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'mode': "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean",
+                'normalize': any(type(module).__name__ == "Normalize" for module in model),
+                'max_seq_length': model.max_seq_length,
+                'dimension': model.get_sentence_embedding_dimension()
+            }, f)
+
+    if quantize and not (model_dir / "model-int8.onnx").exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizing {model_name} to int8...")
+        tmp_file = model_dir / "model-int8.tmp"
+        quantize_dynamic(str(model_file), str(tmp_file), weight_type=QuantType.QInt8)
+        os.replace(tmp_file, model_dir / "model-int8.onnx")
+
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    ONNXBackend.name: ONNXBackend,
+}
+
+def embedding_id(name: str, model_name: str) -> str:
+    """
+    Embedding id of the backend registered under name, known without loading its model
+    """
+    if name == SentenceTransformerBackend.name:
+        # Plain model name, so embeddings cached before backends existed stay valid
+        return model_name
+    return f"{model_name}-{name}"
+
+def get_embedding_backend(name: str, model_name: str, onnx_path: str = "./onnx_models",
+                          threads: int = 0) -> EmbeddingBackend:
+    """
+    Create the embedding backend registered under name; "onnx-int8" is the quantized ONNX backend
+    """
+    if name in ("onnx", "onnx-int8"):
+        return ONNXBackend(model_name, onnx_path, quantize=name == "onnx-int8", threads=threads)
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. "
+                         f"Available: {', '.join(list(EMBEDDING_BACKENDS) + ['onnx-int8'])}")
+    return EMBEDDING_BACKENDS[name](model_name)
+
+def length_buckets(lengths: List[int], batch_size: int) -> List[np.ndarray]:
+    """
+    Indices of texts grouped into batches of similar length, shortest first
+
+    Padding within a batch then stays small; the indices put the results back in order.
+    """
+    order = np.argsort(np.asarray(lengths), kind='stable')
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+# The embedding backend of an embedding worker process
+_worker_backend: Optional[EmbeddingBackend] = None
+
+def _init_embedding_worker(name: str, model_name: str, onnx_path: str, threads: int) -> None:
+    global _worker_backend
+    # Pin the math libraries before they start their thread pools, so the workers
+    # together use about one thread per core instead of each using all of them
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    _worker_backend = get_embedding_backend(name, model_name, onnx_path=onnx_path, threads=threads)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+def _encode_in_worker(texts: List[str], batch_size: int) -> np.ndarray:
+    return _worker_backend.encode(texts, batch_size=batch_size)
+
+class ParallelEncoder:
+    """
+    Embeds large text collections across a pool of worker processes
+
+    Every worker loads its own copy of the backend's model with threads_per_worker
+    threads (by default the cores divided among the workers). Texts are sorted
+    by length and cut into batches, the batches are spread over the workers, and
+    the embeddings come back in the original order. Meant for index builds;
+    queries are embedded in-process.
+    """
+
+    def __init__(self, name: str, model_name: str, workers: int, onnx_path: str = "./onnx_models",
+                 threads_per_worker: int = 0):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max((os.cpu_count() or 1) // workers, 1)
+        # Spawned rather than forked: forking a process whose PyTorch thread pool is
+        # already running can deadlock the children. As with any spawned pool, a
+        # calling script needs an if __name__ == "__main__" guard.
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_embedding_worker,
+            initargs=(name, model_name, onnx_path, self.threads_per_worker)
+        )
+        logger.info(f"Started {workers} embedding workers with {self.threads_per_worker} thread(s) each")
+
+    def encode(self, texts: List[str], batch_size: int = 32, tokenizer=None) -> np.ndarray:
+        """
+        Embed texts as a float32 (len(texts), dimension) matrix in input order
+
+        Batches are formed by token length with tokenizer, by character length without.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+        if tokenizer is not None:
+            lengths = [len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']]
+        else:
+            lengths = [len(text) for text in texts]
+
+        batches = length_buckets(lengths, batch_size)
+        futures = [self.pool.submit(_encode_in_worker, [texts[i] for i in batch], batch_size)
+                   for batch in batches]
+
+        embeddings = None
+        for batch, future in zip(batches, futures):
+            batch_embeddings = future.result()
+            if embeddings is None:
+                embeddings = np.zeros((len(texts), batch_embeddings.shape[1]), dtype='float32')
+            embeddings[batch] = batch_embeddings
+        return embeddings
+
+    def close(self) -> None:
+        """
+        Stop the worker processes
+        """
+        self.pool.shutdown()
+
+def check_parity(backend: EmbeddingBackend, reference: EmbeddingBackend, texts: List[str],
+                 threshold: float = 0.99) -> Dict:
+    """
+    Compare a backend's embeddings with the reference backend's, text by text
+
+    Passes when every pair has cosine similarity of at least threshold.
+    """
+    ours = backend.encode(texts)
+    theirs = reference.encode(texts)
+    cosines = (ours * theirs).sum(axis=1) / (np.linalg.norm(ours, axis=1) * np.linalg.norm(theirs, axis=1))
+    return {
+        'backend': backend.embedding_id,
+        'min_cosine': float(cosines.min()),
+        'mean_cosine': float(cosines.mean()),
+        'passed': bool(cosines.min() >= threshold)
+    }
+
+def measure_throughput(backend: EmbeddingBackend, texts: List[str], batch_size: int = 32,
+                       single_queries: int = 100) -> Dict:
+    """
+    Single-query latency (p50/p99) and batch throughput in texts per second
+    """
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # Warm up
+
+    latencies = []
+    for text in (texts * (single_queries // max(len(texts), 1) + 1))[:single_queries]:
+        start_time = time.perf_counter()
+        backend.encode([text])
+        latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    backend.encode(texts, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start_time
+
+    return {
+        'backend': backend.embedding_id,
+        'single_p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'single_p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'batch_texts_per_second': len(texts) / batch_seconds if batch_seconds > 0 else 0.0
+    }
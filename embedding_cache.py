@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = 32  # SHA-256 digest bytes
+
+def text_key(text: str) -> bytes:
+    """
+    Cache key of a chunk: SHA-256 of its NFC-normalized, whitespace-collapsed text
+    """
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode('utf-8')).digest()
+
+class EmbeddingCache:
+    """
+    Content-addressed, append-only store of chunk embeddings for one embedding model
+
+    Each model gets its own directory holding the raw float32 vectors (read back
+    through a memory map) and the text key of every row, in the same order. Rows
+    are only ever appended, vectors before keys, so a build that dies midway leaves
+    at most some unreferenced vector bytes behind. Threads of one process must share
+    a single instance per directory; its lock serializes appends and lookups.
+    """
+
+    def __init__(self, cache_path: str, model_name: str):
+        safe_name = re.sub(r'[^\w.-]+', '_', model_name)
+        self.path = Path(cache_path) / safe_name
+        self.model_name = model_name
+        self.vectors_file = self.path / "vectors.f32"
+        self.keys_file = self.path / "keys.bin"
+        self.info_file = self.path / "info.json"
+
+        self.dimension: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _load(self) -> None:
+        """
+        Read the key list and map the vectors written so far
+        """
+        if not self.info_file.exists():
+            return
+
+        try:
+            with open(self.info_file, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            if info.get('model') != self.model_name:
+                logger.warning(f"Embedding cache at {self.path} belongs to {info.get('model')}; ignoring it")
+                return
+            self.dimension = int(info['dimension'])
+
+            keys = self.keys_file.read_bytes() if self.keys_file.exists() else b""
+            row_bytes = self.dimension * 4
+            vector_rows = self.vectors_file.stat().st_size // row_bytes if self.vectors_file.exists() else 0
+            count = min(len(keys) // KEY_SIZE, vector_rows)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Error reading embedding cache at {self.path}: {e}")
+            self.dimension = None
+            return
+
+        self._rows = {keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]: i for i in range(count)}
+        self._vectors = None
+        logger.info(f"Embedding cache holds {count} vectors for {self.model_name}")
+
+    def _mapped_vectors(self) -> np.memmap:
+        """
+        Memory map covering every row written so far, re-mapped after appends
+        """
+        count = len(self._rows)
+        if self._vectors is None or len(self._vectors) < count:
+            self._vectors = np.memmap(self.vectors_file, dtype='<f4', mode='r', shape=(count, self.dimension))
+        return self._vectors
+
+    def lookup(self, keys: List[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """
+        Split keys into cached vectors by position and the positions that missed
+        """
+        with self._lock:
+            return self._lookup(keys)
+
+    def _lookup(self, keys: List[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        hits = {}
+        misses = []
+        for position, key in enumerate(keys):
+            row = self._rows.get(key)
+            if row is None:
+                misses.append(position)
+            else:
+                hits[position] = row
+
+        if not hits:
+            return {}, misses
+
+        # Gather all hits with one fancy-index read from the map
+        vectors = np.asarray(self._mapped_vectors()[list(hits.values())])
+        return dict(zip(hits, vectors)), misses
+
+    def add(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """
+        Append vectors under their keys, skipping keys that are already stored
+        """
+        with self._lock:
+            self._add(keys, vectors)
+
+    def _add(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype='<f4')
+        if self.dimension is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            for stale in (self.vectors_file, self.keys_file):
+                if stale.exists():
+                    stale.unlink()
+            self.dimension = vectors.shape[1]
+            tmp_file = self.info_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'model': self.model_name, 'dimension': self.dimension}, f)
+            os.replace(tmp_file, self.info_file)
+
+        new_rows = {}
+        for position, key in enumerate(keys):
+            if key not in self._rows:
+                new_rows.setdefault(key, position)
+        if not new_rows:
+            return
+
+        try:
+            # Trim bytes left by an interrupted append so rows and keys stay aligned
+            start = len(self._rows)
+            with open(self.vectors_file, 'ab') as f:
+                f.truncate(start * self.dimension * 4)
+                f.write(vectors[list(new_rows.values())].tobytes())
+            with open(self.keys_file, 'ab') as f:
+                f.truncate(start * KEY_SIZE)
+                f.write(b"".join(new_rows))
+        except OSError as e:
+            logger.warning(f"Error writing embedding cache at {self.path}: {e}")
+            return
+
+        for offset, key in enumerate(new_rows):
+            self._rows[key] = start + offset
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from typing import Callable, Iterable, Iterator, List, Optional
+from pathlib import Path
+from chunk_store import _replace_atomically
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Layout inside the vector database directory:
+#   snapshots/v000001/ ... one immutable directory per save, with snapshot.json
+#   CURRENT             name of the snapshot readers should load
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+SNAPSHOT_MANIFEST = "snapshot.json"
+
+def _snapshot_number(name: str) -> int:
+    return int(name[1:]) if name.startswith("v") and name[1:].isdigit() else -1
+
+def _fsync_path(path: Path) -> None:
+    """
+    Flush a file, or a directory entry, to disk where the platform allows it
+    """
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return  # Directories cannot be opened on Windows
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _file_checksum(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def list_snapshots(db_path: Path) -> List[str]:
+    """
+    Names of the published snapshots, newest first
+    """
+    snapshots_dir = db_path / SNAPSHOTS_DIR
+    if not snapshots_dir.exists():
+        return []
+    names = [path.name for path in snapshots_dir.iterdir() if path.is_dir() and _snapshot_number(path.name) >= 0]
+    return sorted(names, key=_snapshot_number, reverse=True)
+
+def read_current_snapshot(db_path: Path) -> Optional[str]:
+    """
+    Name of the snapshot the CURRENT pointer refers to, if any
+    """
+    try:
+        return (db_path / CURRENT_FILE).read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+def verify_snapshot(snapshot_path: Path, checksums: bool = False) -> bool:
+    """
+    Whether a snapshot has every file its manifest lists, with the recorded sizes and checksums
+    """
+    try:
+        with open(snapshot_path / SNAPSHOT_MANIFEST, 'r', encoding='utf-8') as f:
+            files = json.load(f)['files']
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Snapshot {snapshot_path.name} has no readable manifest: {e}")
+        return False
+
+    for name, entry in files.items():
+        path = snapshot_path / name
+        if not path.exists() or path.stat().st_size != entry['bytes']:
+            logger.error(f"Snapshot {snapshot_path.name}: {name} is missing or has the wrong size")
+            return False
+        if checksums and _file_checksum(path) != entry['sha256']:
+            logger.error(f"Snapshot {snapshot_path.name}: checksum mismatch for {name}")
+            return False
+    return True
+
+def resolve_snapshot(db_path: Path, checksums: bool = False) -> Optional[Path]:
+    """
+    Directory of the snapshot to load: the current one, or the newest intact one if it is damaged
+
+    By default only the manifest and file sizes are checked, which costs a few
+    stat calls; checksums=True also hashes every file.
+    """
+    current = read_current_snapshot(db_path)
+    names = list_snapshots(db_path)
+    if current in names:
+        names.remove(current)
+        names.insert(0, current)
+
+    for name in names:
+        snapshot_path = db_path / SNAPSHOTS_DIR / name
+        if verify_snapshot(snapshot_path, checksums):
+            if name != current:
+                logger.warning(f"Current snapshot {current} is unusable, falling back to {name}")
+            return snapshot_path
+    return None
+
+def fallback_snapshots(db_path: Path, failed: str, checksums: bool = True) -> Iterator[Path]:
+    """
+    Snapshots older than a failed one, newest first, that pass verification
+    """
+    for name in list_snapshots(db_path):
+        if _snapshot_number(name) < _snapshot_number(failed):
+            snapshot_path = db_path / SNAPSHOTS_DIR / name
+            if verify_snapshot(snapshot_path, checksums):
+                yield snapshot_path
+
+def snapshot_data_path(db_path: Path, checksums: bool = False) -> Path:
+    """
+    Directory with the index files to read: the resolved snapshot, or db_path for the legacy flat layout
+    """
+    return resolve_snapshot(db_path, checksums) or db_path
+
+def publish_snapshot(db_path: Path, write: Callable[[Path], None], keep: int = 3,
+                     protect: Iterable[Optional[str]] = ()) -> str:
+    """
+    Write a new snapshot and make it current; returns its name
+
+    write(directory) saves the index files into a private staging directory. Their
+    sizes and SHA-256 checksums go into snapshot.json, the files are flushed to
+    disk, the directory is renamed into snapshots/ under the next version number
+    and only then is CURRENT replaced. A crash at any point leaves the previous
+    snapshot current, and readers never see a partly written one.
+
+    All but the keep newest snapshots are deleted afterwards, except the current
+    one and those named in protect (snapshots still loaded by this process).
+    """
+    snapshots_dir = db_path / SNAPSHOTS_DIR
+    snapshots_dir.mkdir(parents=True, exist_ok=True)
+    staging = snapshots_dir / f".staging-{os.getpid()}-{time.time_ns()}"
+    staging.mkdir()
+
+    try:
+        write(staging)
+
+        files = {}
+        for path in sorted(staging.iterdir()):
+            _fsync_path(path)
+            files[path.name] = {'bytes': path.stat().st_size, 'sha256': _file_checksum(path)}
+        manifest = json.dumps({
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            'files': files
+        }, indent=2)
+        _replace_atomically(staging / SNAPSHOT_MANIFEST, lambda f: f.write(manifest.encode('utf-8')))
+        _fsync_path(staging / SNAPSHOT_MANIFEST)
+        _fsync_path(staging)
+
+        # Another process may publish concurrently; take the next free number
+        while True:
+            existing = list_snapshots(db_path)
+            name = f"v{(_snapshot_number(existing[0]) if existing else 0) + 1:06d}"
+            try:
+                os.rename(staging, snapshots_dir / name)
+                break
+            except OSError:
+                if not (snapshots_dir / name).exists():
+                    raise
+        _fsync_path(snapshots_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _replace_atomically(db_path / CURRENT_FILE, lambda f: f.write(name.encode('utf-8')))
+    _fsync_path(db_path)
+    logger.info(f"Published index snapshot {name}")
+
+    prune_snapshots(db_path, keep, protect=list(protect) + [name])
+    return name
+
+def prune_snapshots(db_path: Path, keep: int = 3, protect: Iterable[Optional[str]] = ()) -> List[str]:
+    """
+    Delete all but the keep newest snapshots, never the current or protected ones
+
+    Processes that memory-mapped a deleted snapshot keep reading it until they
+    close it (POSIX keeps deleted files alive while they are open).
+    """
+    protected = set(protect) | {read_current_snapshot(db_path)}
+    removed = []
+    for name in list_snapshots(db_path)[max(keep, 1):]:
+        if name in protected:
+            continue
+        try:
+            shutil.rmtree(db_path / SNAPSHOTS_DIR / name)
+            removed.append(name)
+        except OSError as e:
+            logger.warning(f"Could not delete snapshot {name}: {e}")
+    return removed
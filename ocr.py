@@ -0,0 +1,111 @@
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from pathlib import Path
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def bengali_ratio(text: str) -> float:
+    """
+    Fraction of non-space characters in the Bengali Unicode block
+
+    Legacy-font PDFs and broken conjunct handling show up as a low ratio.
+    """
+    letters = [char for char in text if not char.isspace()]
+    if not letters:
+        return 0.0
+    return sum(1 for char in letters if 'ঀ' <= char <= '৿') / len(letters)
+
+class BengaliOCR:
+    """
+    Tesseract OCR fallback for PDF pages whose text layer is missing or unusable
+
+    Pages are rendered with PDFium and recognized in a process pool. Results are
+    cached on disk by a hash of the rendered page image, so a page is only ever
+    recognized once per OCR configuration, whichever PDF it appears in.
+    """
+
+    def __init__(self, cache_path: str = "./text_cache/ocr", language: str = "ben+eng", dpi: int = 300,
+                 workers: int = 1, min_chars: int = 30, min_bengali_ratio: float = 0.2):
+        try:
+            import pypdfium2  # noqa: F401
+            import pytesseract
+        except ImportError as e:
+            raise ImportError("OCR fallback requires pytesseract and pypdfium2 "
+                              "(pip install pytesseract pypdfium2) plus the Tesseract binary "
+                              "with Bengali language data (e.g. tesseract-ocr-ben)") from e
+
+        self.cache_path = Path(cache_path)
+        self.language = language
+        self.dpi = dpi
+        self.workers = workers
+        self.min_chars = min_chars
+        self.min_bengali_ratio = min_bengali_ratio
+        self.version = f"tesseract-{pytesseract.get_tesseract_version()}-{language}-{dpi}dpi"
+
+    def needs_ocr(self, text: str) -> bool:
+        """
+        Whether a page's extracted text is too short or too un-Bengali to trust
+        """
+        stripped = text.strip()
+        return len(stripped) < self.min_chars or bengali_ratio(stripped) < self.min_bengali_ratio
+
+    def ocr_pages(self, pdf_path: Path, page_numbers: List[int]) -> Dict[int, str]:
+        """
+        Recognize the given pages (numbered from 1), in parallel when workers > 1
+        """
+        if not page_numbers:
+            return {}
+
+        count = len(page_numbers)
+        args = ([str(pdf_path)] * count, page_numbers, [str(self.cache_path)] * count,
+                [self.language] * count, [self.dpi] * count, [self.version] * count)
+
+        if self.workers <= 1 or count == 1:
+            return dict(map(_ocr_page, *args))
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, count)) as pool:
+            return dict(pool.map(_ocr_page, *args))
+
+def _ocr_page(pdf_path: str, page_num: int, cache_path: str, language: str, dpi: int,
+              version: str) -> Tuple[int, str]:
+    """
+    Render and recognize one page inside a worker process, going through the page cache
+    """
+    import pypdfium2
+    import pytesseract
+
+    try:
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            image = pdf[page_num - 1].render(scale=dpi / 72).to_pil()
+        finally:
+            pdf.close()
+    except Exception as e:
+        logger.warning(f"Error rendering page {page_num} of {Path(pdf_path).name}: {e}")
+        return page_num, ""
+
+    image_hash = hashlib.sha256(f"{image.mode}{image.size}".encode('utf-8') + image.tobytes()).hexdigest()
+    cache_file = Path(cache_path) / f"{image_hash}_{version}.txt"
+    if cache_file.exists():
+        return page_num, cache_file.read_text(encoding='utf-8')
+
+    try:
+        text = pytesseract.image_to_string(image, lang=language)
+    except Exception as e:
+        logger.warning(f"OCR failed on page {page_num} of {Path(pdf_path).name}: {e}")
+        return page_num, ""
+
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(text, encoding='utf-8')
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logger.warning(f"Error writing OCR cache for page {page_num} of {Path(pdf_path).name}: {e}")
+
+    return page_num, text
@@ -0,0 +1,166 @@
+from typing import Dict, Iterator, Optional, Tuple, Type
+from pathlib import Path
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PDFTextBackend:
+    """
+    Interface for PDF text extraction libraries used by BengaliPDFProcessor
+    """
+
+    name = "base"
+
+    @property
+    def version(self) -> str:
+        """
+        Library version; part of the text cache key, since extraction output changes between releases
+        """
+        raise NotImplementedError
+
+    def page_count(self, pdf_path: Path) -> int:
+        """
+        Get the number of pages in a PDF file
+        """
+        raise NotImplementedError
+
+    def iter_pages(self, pdf_path: Path, start_page: int = 0,
+                   end_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, raw_text) for pages [start_page, end_page), page numbers starting at 1
+        """
+        raise NotImplementedError
+
+class PyPDF2Backend(PDFTextBackend):
+    """
+    Pure-Python extraction with PyPDF2
+    """
+
+    name = "pypdf2"
+
+    # PyPDF2 is imported on first use rather than at startup, like the optional backends
+
+    @property
+    def version(self) -> str:
+        import PyPDF2
+        return PyPDF2.__version__
+
+    def page_count(self, pdf_path: Path) -> int:
+        import PyPDF2
+        with open(pdf_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def iter_pages(self, pdf_path: Path, start_page: int = 0,
+                   end_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        import PyPDF2
+        with open(pdf_path, 'rb') as file:
+            pages = PyPDF2.PdfReader(file).pages
+            if end_page is None or end_page > len(pages):
+                end_page = len(pages)
+
+            for page_num in range(start_page, end_page):
+                try:
+                    yield page_num + 1, pages[page_num].extract_text() or ""
+                except Exception as e:
+                    logger.warning(f"Error extracting text from page {page_num + 1} of {pdf_path.name}: {e}")
+
+class PdfiumBackend(PDFTextBackend):
+    """
+    Extraction with PDFium (the Chrome PDF engine) through pypdfium2
+    """
+
+    name = "pdfium"
+
+    def __init__(self):
+        try:
+            import pypdfium2
+        except ImportError as e:
+            raise ImportError("The 'pdfium' PDF backend requires pypdfium2: pip install pypdfium2") from e
+        self._pdfium = pypdfium2
+
+    @property
+    def version(self) -> str:
+        from pypdfium2 import version
+        return f"{version.PYPDFIUM_INFO}-{version.PDFIUM_INFO}"
+
+    def page_count(self, pdf_path: Path) -> int:
+        pdf = self._pdfium.PdfDocument(str(pdf_path))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def iter_pages(self, pdf_path: Path, start_page: int = 0,
+                   end_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        pdf = self._pdfium.PdfDocument(str(pdf_path))
+        try:
+            if end_page is None or end_page > len(pdf):
+                end_page = len(pdf)
+
+            for page_num in range(start_page, end_page):
+                try:
+                    page = pdf[page_num]
+                    text_page = page.get_textpage()
+                    text = text_page.get_text_range()
+                    text_page.close()
+                    page.close()
+                    yield page_num + 1, text
+                except Exception as e:
+                    logger.warning(f"Error extracting text from page {page_num + 1} of {pdf_path.name}: {e}")
+        finally:
+            pdf.close()
+
+class PdfMinerBackend(PDFTextBackend):
+    """
+    Layout-aware extraction with pdfminer.six
+    """
+
+    name = "pdfminer"
+
+    def __init__(self):
+        try:
+            import pdfminer
+            from pdfminer.high_level import extract_pages
+            from pdfminer.layout import LTTextContainer
+            from pdfminer.pdfpage import PDFPage
+        except ImportError as e:
+            raise ImportError("The 'pdfminer' PDF backend requires pdfminer.six: pip install pdfminer.six") from e
+        self._pdfminer = pdfminer
+        self._extract_pages = extract_pages
+        self._text_container = LTTextContainer
+        self._pdf_page = PDFPage
+
+    @property
+    def version(self) -> str:
+        return getattr(self._pdfminer, "__version__", "unknown")
+
+    def page_count(self, pdf_path: Path) -> int:
+        with open(pdf_path, 'rb') as file:
+            return sum(1 for _ in self._pdf_page.get_pages(file))
+
+    def iter_pages(self, pdf_path: Path, start_page: int = 0,
+                   end_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        if end_page is None:
+            end_page = self.page_count(pdf_path)
+
+        # extract_pages yields the selected pages in document order
+        layouts = self._extract_pages(str(pdf_path), page_numbers=range(start_page, end_page))
+        for page_num, layout in enumerate(layouts, start_page + 1):
+            text = "".join(element.get_text() for element in layout if isinstance(element, self._text_container))
+            yield page_num, text
+
+PDF_BACKENDS: Dict[str, Type[PDFTextBackend]] = {
+    PyPDF2Backend.name: PyPDF2Backend,
+    PdfiumBackend.name: PdfiumBackend,
+    PdfMinerBackend.name: PdfMinerBackend,
+}
+
+def get_pdf_backend(name: str) -> PDFTextBackend:
+    """
+    Create the extraction backend registered under name
+    """
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{name}'. Available: {', '.join(PDF_BACKENDS)}")
+    return PDF_BACKENDS[name]()
@@ -1,47 +1,230 @@
 import os
-import PyPDF2
 import re
-from typing import List, Dict
+import json
+import hashlib
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
 import logging
+from pdf_backends import PDFTextBackend, get_pdf_backend
+from ocr import BengaliOCR, bengali_ratio
+from section_index import SectionIndex
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# (char_offset, page_number) for every page that contributed text, in page order
+PageTable = List[Tuple[int, int]]
+
+# Bump when extract_document or clean_bengali_text change their output,
+# so cached texts from the old rules are not reused
+CLEANER_VERSION = 1
+
+# Sentence ends: danda, double danda, "!" and "?", and "|", which SutonnyMJ-encoded PDFs use for the danda
+_SENTENCE_END_PATTERN = re.compile(r'[।৷!?|]')
+
 class BengaliPDFProcessor:
     """
     A class to process Bengali PDF documents for the legal RAG system
     """
     
-    def __init__(self, data_path: str = "./data"):
+    def __init__(self, data_path: str = "./data", cache_path: Optional[str] = None, backend: str = "pypdf2",
+                 ocr: Optional[BengaliOCR] = None):
         self.data_path = Path(data_path)
+        self.backend: PDFTextBackend = get_pdf_backend(backend)
+        self.ocr = ocr  # OCR fallback for empty or garbled pages, None disables it
+        self.cache_path = Path(cache_path) if cache_path else None  # Extracted text cache, None disables it
         self.processed_texts = {}
+        self.file_timings = {}  # Seconds spent extracting each document
         
-    def extract_text_from_pdf(self, pdf_path: Path) -> str:
+    def list_pdf_files(self) -> List[Path]:
         """
-        Extract text content from a PDF file
+        List the PDF files in the data directory in a stable order
+        """
+        if not self.data_path.exists():
+            return []
+        return sorted(self.data_path.glob("*.pdf"))
+    
+    @staticmethod
+    def compute_file_hash(pdf_path: Path) -> str:
+        """
+        Compute the SHA-256 hash of a file's content
+        """
+        sha256 = hashlib.sha256()
+        with open(pdf_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha256.update(block)
+        return sha256.hexdigest()
+    
+    def get_page_count(self, pdf_path: Path) -> int:
+        """
+        Get the number of pages in a PDF file
         """
         try:
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += f"\n\n--- পৃষ্ঠা {page_num + 1} ---\n\n"
-                            text += page_text
-                    except Exception as e:
-                        logger.warning(f"Error extracting text from page {page_num + 1} of {pdf_path.name}: {e}")
-                        continue
-                        
-            return self.clean_bengali_text(text)
+            return self.backend.page_count(pdf_path)
+        except Exception as e:
+            logger.error(f"Error reading page count of {pdf_path.name}: {e}")
+            return 0
+        
+    def iter_pages(self, pdf_path: Path, start_page: int = 0,
+                   end_page: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, raw_text) for pages [start_page, end_page) of a PDF, one page at a time
+        """
+        for page_num, page_text in self.backend.iter_pages(pdf_path, start_page, end_page):
+            if page_text:
+                yield page_num, page_text
+    
+    def extract_document(self, pdf_path: Path, start_page: int = 0,
+                         end_page: Optional[int] = None) -> Tuple[str, PageTable]:
+        """
+        Extract cleaned text plus its page table, optionally limited to pages [start_page, end_page)
+        
+        Every non-empty page is cleaned on its own and the pages are joined with a
+        single space. The page table holds one (char_offset, page_number) entry per
+        page, so any character span of the text can be mapped back to its pages.
+        """
+        try:
+            return self._extract_pages(pdf_path, start_page, end_page)
             
         except Exception as e:
             logger.error(f"Error processing PDF {pdf_path.name}: {e}")
-            return ""
+            return "", []
+    
+    def _extract_pages(self, pdf_path: Path, start_page: int = 0,
+                       end_page: Optional[int] = None) -> Tuple[str, PageTable]:
+        """
+        Same as extract_document, but a failing page propagates its exception
+        """
+        pages = ((page_num, self.clean_bengali_text(page_text))
+                 for page_num, page_text in self.iter_pages(pdf_path, start_page, end_page))
+        return self._join_pages(pages)
+    
+    @staticmethod
+    def _join_pages(pages: Iterable[Tuple[int, str]]) -> Tuple[str, PageTable]:
+        """
+        Join cleaned (page_number, text) pages with single spaces and build the page table
+        """
+        parts = []
+        page_table = []
+        offset = 0
+        for page_num, page_text in pages:
+            if not page_text:
+                continue
+            if parts:
+                offset += 1  # Joining space
+            page_table.append((offset, page_num))
+            parts.append(page_text)
+            offset += len(page_text)
+        return " ".join(parts), page_table
+    
+    def _apply_ocr(self, pdf_path: Path, text: str, page_table: PageTable) -> Tuple[str, PageTable]:
+        """
+        Re-read empty or low-quality pages with OCR and splice the results into the document
+        
+        Only the pages that fail the OCR quality check are rendered and recognized; an
+        OCR result replaces the extracted text only if it is at least as Bengali.
+        """
+        if self.ocr is None:
+            return text, page_table
+        
+        page_count = self.get_page_count(pdf_path)
+        page_ends = [offset - 1 for offset, _ in page_table[1:]] + [len(text)]
+        pages = {page_num: text[offset:end] for (offset, page_num), end in zip(page_table, page_ends)}
+        
+        candidates = [page_num for page_num in range(1, page_count + 1) if self.ocr.needs_ocr(pages.get(page_num, ""))]
+        if not candidates:
+            return text, page_table
+        
+        logger.info(f"Running OCR on {len(candidates)} of {page_count} pages of {pdf_path.name}")
+        for page_num, ocr_text in self.ocr.ocr_pages(pdf_path, candidates).items():
+            cleaned = self.clean_bengali_text(ocr_text)
+            if cleaned and bengali_ratio(cleaned) >= bengali_ratio(pages.get(page_num, "")):
+                pages[page_num] = cleaned
+        
+        return self._join_pages(sorted(pages.items()))
+    
+    def extract_text_from_pdf(self, pdf_path: Path, start_page: int = 0,
+                              end_page: Optional[int] = None) -> str:
+        """
+        Extract text content from a PDF file, optionally limited to pages [start_page, end_page)
+        """
+        if start_page == 0 and end_page is None:
+            return self.load_document(pdf_path)[0]
+        return self.extract_document(pdf_path, start_page, end_page)[0]
+    
+    def load_document(self, pdf_path: Path) -> Tuple[str, PageTable]:
+        """
+        Get the cleaned text and page table of a whole PDF, from the text cache when possible
+        
+        Unlike extract_document this also runs the OCR fallback, if enabled. A PDF that
+        fails to extract yields empty text and is not cached, so the next build retries it.
+        """
+        cached = self._read_text_cache(pdf_path)
+        if cached is not None:
+            return cached
+        
+        try:
+            text, page_table = self._extract_pages(pdf_path)
+        except Exception as e:
+            logger.error(f"Error processing PDF {pdf_path.name}: {e}")
+            return "", []
+        
+        text, page_table = self._apply_ocr(pdf_path, text, page_table)
+        self._write_text_cache(pdf_path, text, page_table)
+        return text, page_table
+    
+    def _text_cache_file(self, pdf_path: Path) -> Optional[Path]:
+        """
+        Cache entry for a PDF, keyed by its content hash and the extractor/cleaner version
+        """
+        if self.cache_path is None:
+            return None
+        try:
+            file_hash = self.compute_file_hash(pdf_path)
+        except OSError as e:
+            logger.warning(f"Error hashing {pdf_path.name}: {e}")
+            return None
+        version = f"{self.backend.name}-{self.backend.version}-clean-{CLEANER_VERSION}"
+        if self.ocr is not None:
+            version += f"-ocr-{self.ocr.version}"
+        return self.cache_path / f"{file_hash}_{version}.json"
+    
+    def _read_text_cache(self, pdf_path: Path) -> Optional[Tuple[str, PageTable]]:
+        """
+        Read a cached extraction result, or None on a miss
+        """
+        cache_file = self._text_cache_file(pdf_path)
+        if cache_file is None or not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            logger.info(f"Loaded cached text for {pdf_path.name}")
+            return cached['text'], [tuple(entry) for entry in cached['page_table']]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable text cache entry {cache_file.name}: {e}")
+            return None
+    
+    def _write_text_cache(self, pdf_path: Path, text: str, page_table: PageTable) -> None:
+        """
+        Store an extraction result; empty results are not cached so failures get retried
+        """
+        cache_file = self._text_cache_file(pdf_path)
+        if cache_file is None or not text:
+            return
+        try:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'text': text, 'page_table': page_table}, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"Error writing text cache for {pdf_path.name}: {e}")
     
     def clean_bengali_text(self, text: str) -> str:
         """
@@ -65,85 +248,315 @@ class BengaliPDFProcessor:
         
         return text.strip()
     
-    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+    def chunk_spans(self, text: str, chunk_size: int = 1000, overlap: int = 200,
+                    tokenizer=None) -> List[Tuple[int, int]]:
         """
-        Split text into overlapping chunks for better retrieval
+        Split text into overlapping chunks, returned as (start, end) character offsets
+        
+        Makes a single pass over the sentence boundaries. A chunk is closed at the last
+        sentence end that keeps it within chunk_size, and the next chunk starts at the
+        first word boundary inside the last `overlap` characters of the previous one
+        (without overlap if that would not fit). A sentence longer than chunk_size is
+        split at line breaks, then spaces, then mid-word, so no chunk exceeds chunk_size.
+        
+        With a (fast, Hugging Face) tokenizer, chunk_size and overlap are measured in
+        that tokenizer's tokens instead, and no chunk ever exceeds chunk_size tokens.
         """
         if not text:
             return []
-            
-        # Split by sentences first (Bengali sentence endings)
-        sentences = re.split(r'[।৷!?]', text)
         
-        chunks = []
-        current_chunk = ""
+        # Bengali sentence endings ("|" in SutonnyMJ-encoded PDFs); the final sentence may be unterminated
+        sentence_ends = [match.end() for match in re.finditer(_SENTENCE_END_PATTERN, text)]
+        if not sentence_ends or sentence_ends[-1] < len(text):
+            sentence_ends.append(len(text))
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            # If adding this sentence would exceed chunk size, save current chunk
-            if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
+        if tokenizer is not None:
+            return self._chunk_token_spans(text, sentence_ends, chunk_size, overlap, tokenizer)
+        
+        spans = []
+        chunk_start = 0
+        chunk_end = 0
+        
+        # Pieces of long sentences leave room for the overlap
+        piece_size = max(chunk_size - overlap, chunk_size // 2, 1)
+        for sentence_end in self._split_long_sentences(text, sentence_ends, piece_size):
+            if sentence_end - chunk_start > chunk_size and chunk_end > chunk_start:
+                self._append_span(spans, text, chunk_start, chunk_end)
                 
-                # Create overlap by keeping last part of current chunk
-                words = current_chunk.split()
-                overlap_words = words[-overlap//10:] if len(words) > overlap//10 else words
-                current_chunk = " ".join(overlap_words) + " " + sentence
-            else:
-                current_chunk += " " + sentence
+                # Create overlap by starting at a word boundary near the end of the previous chunk
+                overlap_start = text.find(' ', max(chunk_end - overlap, chunk_start), chunk_end)
+                chunk_start = overlap_start + 1 if overlap_start >= chunk_start else chunk_end
+                if sentence_end - chunk_start > chunk_size:
+                    chunk_start = chunk_end
+            chunk_end = sentence_end
         
         # Add the last chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        self._append_span(spans, text, chunk_start, chunk_end)
             
-        return chunks
+        return spans
     
-    def process_all_pdfs(self, chunk_size: int = 1000, overlap: int = 200) -> Dict[str, List[str]]:
+    @staticmethod
+    def _split_long_sentences(text: str, sentence_ends: List[int], limit: int) -> List[int]:
         """
-        Process all PDF files in the data directory
+        Sentence ends plus extra break points wherever a sentence is longer than limit characters
+        
+        A long sentence breaks at its last line break within limit, else its last
+        space, else exactly at limit.
+        """
+        ends = []
+        previous = 0
+        for sentence_end in sentence_ends:
+            while sentence_end - previous > limit:
+                cut = text.rfind('\n', previous + 1, previous + limit + 1)
+                if cut <= previous:
+                    cut = text.rfind(' ', previous + 1, previous + limit + 1)
+                if cut <= previous:
+                    cut = previous + limit
+                ends.append(cut)
+                previous = cut
+            ends.append(sentence_end)
+            previous = sentence_end
+        return ends
+    
+    def _chunk_token_spans(self, text: str, sentence_ends: List[int], chunk_size: int, overlap: int,
+                           tokenizer) -> List[Tuple[int, int]]:
         """
-        all_chunks = {}
+        Token-measured variant of chunk_spans
+        
+        The text is tokenized once with character offsets. Each chunk takes at most
+        chunk_size tokens and ends at the last sentence boundary inside that window,
+        or is cut at the window edge if no boundary lies past the previous chunk.
+        The next chunk starts `overlap` tokens before the end of the previous one.
+        """
+        encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        token_offsets = [(start, end) for start, end in encoding['offset_mapping'] if end > start]
+        token_count = len(token_offsets)
+        if not token_count:
+            return []
+        
+        # Sentence boundaries as token indices: a sentence ending at char e ends before the first token starting at e
+        token_starts = [start for start, _ in token_offsets]
+        boundaries = sorted({bisect_left(token_starts, sentence_end) for sentence_end in sentence_ends})
         
+        spans = []
+        start = 0
+        end = 0
+        while start < token_count:
+            limit = start + chunk_size
+            if limit >= token_count:
+                next_end = token_count
+            else:
+                # The boundary must lie past the previous chunk, or the chunk would add no new text
+                boundary = bisect_right(boundaries, limit) - 1
+                next_end = boundaries[boundary] if boundary >= 0 and boundaries[boundary] > end else limit
+            end = next_end
+            
+            self._append_span(spans, text, token_offsets[start][0], token_offsets[end - 1][1])
+            if end >= token_count:
+                break
+            start = max(end - overlap, start + 1)
+        
+        return spans
+    
+    @staticmethod
+    def _append_span(spans: List[Tuple[int, int]], text: str, start: int, end: int) -> None:
+        """
+        Append [start, end) with surrounding whitespace and punctuation trimmed, unless it is empty
+        """
+        while start < end and (text[start].isspace() or text[start] in '।৷!?|'):
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
+    
+    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200, tokenizer=None) -> List[str]:
+        """
+        Split text into overlapping chunks for better retrieval
+        """
+        return [text[start:end] for start, end in self.chunk_spans(text, chunk_size, overlap, tokenizer)]
+    
+    @staticmethod
+    def page_range(page_table: PageTable, start: int, end: int) -> Tuple[int, int]:
+        """
+        Map a character span of a document to its (first_page, last_page)
+        """
+        if not page_table:
+            return 0, 0
+        offsets = [offset for offset, _ in page_table]
+        first = max(bisect_right(offsets, start) - 1, 0)
+        last = max(bisect_right(offsets, max(end - 1, start)) - 1, 0)
+        return page_table[first][1], page_table[last][1]
+    
+    def _iter_extracted_texts(self, pdf_files: List[Path], workers: int = 1,
+                              pages_per_shard: int = 20) -> Iterator[Tuple[Path, str, PageTable]]:
+        """
+        Yield (pdf_file, cleaned_text, page_table) in input order.
+
+        With workers > 1 every PDF is split into page ranges of pages_per_shard pages,
+        the ranges of all files are extracted and cleaned in a process pool, and each
+        file is reassembled in page order before it is yielded. Files found in the
+        text cache are never sent to the pool, and a file with a failed page range
+        is yielded without that range but never written to the cache.
+        """
+        if workers <= 1:
+            for pdf_file in pdf_files:
+                start_time = time.perf_counter()
+                text, page_table = self.load_document(pdf_file)
+                self.file_timings[pdf_file.stem] = time.perf_counter() - start_time
+                logger.info(f"Extracted {pdf_file.name} in {self.file_timings[pdf_file.stem]:.2f}s")
+                yield pdf_file, text, page_table
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep up to `workers` files in flight so all workers stay busy while
+            # only a bounded number of extracted texts is held in memory
+            pending = deque()
+            remaining = iter(pdf_files)
+            
+            def submit_next() -> bool:
+                pdf_file = next(remaining, None)
+                if pdf_file is None:
+                    return False
+                cached = self._read_text_cache(pdf_file)
+                if cached is not None:
+                    pending.append((pdf_file, 0, [], cached))
+                    return True
+                page_count = self.get_page_count(pdf_file)
+                shards = [
+                    pool.submit(_extract_page_range, self.backend.name, str(pdf_file),
+                                start, min(start + pages_per_shard, page_count))
+                    for start in range(0, page_count, pages_per_shard)
+                ]
+                pending.append((pdf_file, page_count, shards, None))
+                return True
+            
+            while len(pending) < workers and submit_next():
+                pass
+            
+            while pending:
+                pdf_file, page_count, shards, cached = pending.popleft()
+                submit_next()
+                
+                if cached is not None:
+                    self.file_timings[pdf_file.stem] = 0.0
+                    logger.info(f"Extracted {pdf_file.name} from the text cache")
+                    yield pdf_file, cached[0], cached[1]
+                    continue
+                
+                texts = []
+                page_table = []
+                offset = 0
+                worker_time = 0.0
+                failed = 0
+                for shard in shards:
+                    try:
+                        shard_text, shard_pages, shard_time = shard.result()
+                    except Exception as e:
+                        logger.error(f"Error processing a page range of {pdf_file.name}: {e}")
+                        failed += 1
+                        continue
+                    worker_time += shard_time
+                    if not shard_text:
+                        continue
+                    if texts:
+                        offset += 1  # Joining space
+                    page_table.extend((offset + page_offset, page_num) for page_offset, page_num in shard_pages)
+                    texts.append(shard_text)
+                    offset += len(shard_text)
+                
+                self.file_timings[pdf_file.stem] = worker_time
+                logger.info(f"Extracted {pdf_file.name}: {page_count} pages in {len(shards)} shards, "
+                            f"{worker_time:.2f}s worker time")
+                text, page_table = self._apply_ocr(pdf_file, " ".join(texts), page_table)
+                if failed:
+                    # Keep partial text out of the cache so the next build retries the file
+                    logger.warning(f"{failed} of {len(shards)} page ranges of {pdf_file.name} failed; "
+                                   f"not caching its text")
+                else:
+                    self._write_text_cache(pdf_file, text, page_table)
+                yield pdf_file, text, page_table
+    
+    def process_all_pdfs(self, chunk_size: int = 1000, overlap: int = 200,
+                         workers: int = 1, pages_per_shard: int = 20, tokenizer=None) -> Dict[str, List[Dict]]:
+        """
+        Process all PDF files in the data directory
+        
+        Set workers > 1 to extract and clean page ranges in parallel worker processes.
+        Pass the embedding model's tokenizer to measure chunk_size and overlap in tokens.
+        """
         if not self.data_path.exists():
             logger.error(f"Data path {self.data_path} does not exist")
-            return all_chunks
+            return {}
             
-        pdf_files = list(self.data_path.glob("*.pdf"))
+        pdf_files = self.list_pdf_files()
         
         if not pdf_files:
             logger.warning(f"No PDF files found in {self.data_path}")
-            return all_chunks
-            
+            return {}
+        
+        return self.process_pdfs(pdf_files, chunk_size, overlap, workers, pages_per_shard, tokenizer)
+    
+    def process_pdfs(self, pdf_files: List[Path], chunk_size: int = 1000, overlap: int = 200,
+                     workers: int = 1, pages_per_shard: int = 20, tokenizer=None) -> Dict[str, List[Dict]]:
+        """
+        Process the given PDF files into chunks keyed by document name
+        
+        Each chunk is a dict with its 'text' plus its character span in the document
+        text ('char_start', 'char_end') and its page range ('page_start', 'page_end').
+        """
+        return dict(self.iter_processed_documents(pdf_files, chunk_size, overlap, workers, pages_per_shard, tokenizer))
+    
+    def iter_processed_documents(self, pdf_files: List[Path], chunk_size: int = 1000, overlap: int = 200,
+                                 workers: int = 1, pages_per_shard: int = 20,
+                                 tokenizer=None, sections: Optional[SectionIndex] = None) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Yield (document_name, chunks) one document at a time, so only the current
+        document's text and chunks have to be held in memory
+        
+        The chunk text is exactly what gets embedded; the document name and part
+        number travel as metadata instead of being prepended to it. With sections,
+        each document's numbered sections / articles are recorded there as well.
+        """
         logger.info(f"Found {len(pdf_files)} PDF files to process")
+        total_start = time.perf_counter()
         
-        for pdf_file in pdf_files:
+        for pdf_file, text, page_table in self._iter_extracted_texts(pdf_files, workers, pages_per_shard):
             logger.info(f"Processing: {pdf_file.name}")
             
-            # Extract text
-            text = self.extract_text_from_pdf(pdf_file)
-            
             if not text:
                 logger.warning(f"No text extracted from {pdf_file.name}")
                 continue
                 
             # Create chunks
-            chunks = self.chunk_text(text, chunk_size, overlap)
+            spans = self.chunk_spans(text, chunk_size, overlap, tokenizer)
             
-            if chunks:
-                # Add document metadata to each chunk
+            if spans:
+                # Add page provenance to each chunk
                 processed_chunks = []
-                for i, chunk in enumerate(chunks):
-                    chunk_with_metadata = f"নথি: {pdf_file.stem}\nঅংশ: {i+1}/{len(chunks)}\n\n{chunk}"
-                    processed_chunks.append(chunk_with_metadata)
+                for start, end in spans:
+                    page_start, page_end = self.page_range(page_table, start, end)
+                    processed_chunks.append({
+                        'text': text[start:end],
+                        'char_start': start,
+                        'char_end': end,
+                        'page_start': page_start,
+                        'page_end': page_end
+                    })
                 
-                all_chunks[pdf_file.stem] = processed_chunks
-                logger.info(f"Created {len(chunks)} chunks from {pdf_file.name}")
+                if sections is not None:
+                    found = sections.add_document(pdf_file.stem, text, processed_chunks,
+                                                  lambda start, end: self.page_range(page_table, start, end))
+                    if found:
+                        logger.info(f"Found {found} sections in {pdf_file.name}")
+                
+                logger.info(f"Created {len(spans)} chunks from {pdf_file.name}")
+                yield pdf_file.stem, processed_chunks
             else:
                 logger.warning(f"No chunks created from {pdf_file.name}")
         
-        return all_chunks
+        logger.info(f"Processed {len(pdf_files)} PDF files in {time.perf_counter() - total_start:.2f}s "
+                    f"using {max(workers, 1)} worker(s)")
     
     def get_document_summary(self) -> Dict[str, Dict]:
         """
@@ -161,6 +574,16 @@ class BengaliPDFProcessor:
             
         return summary
 
+def _extract_page_range(backend: str, pdf_path: str, start_page: int,
+                        end_page: int) -> Tuple[str, PageTable, float]:
+    """
+    Extract and clean one page range of a PDF inside a worker process
+    """
+    start_time = time.perf_counter()
+    processor = BengaliPDFProcessor(backend=backend)
+    text, page_table = processor._extract_pages(Path(pdf_path), start_page, end_page)
+    return text, page_table, time.perf_counter() - start_time
+
 def test_pdf_processor():
     """
     Test function to verify PDF processing works correctly
@@ -174,7 +597,7 @@ def test_pdf_processor():
     for doc_name, chunks in all_chunks.items():
         print(f"  {doc_name}: {len(chunks)} chunks")
         if chunks:
-            print(f"    Sample: {chunks[0][:100]}...")
+            print(f"    Sample (pages {chunks[0]['page_start']}-{chunks[0]['page_end']}): {chunks[0]['text'][:100]}...")
     
     return all_chunks
 
@@ -0,0 +1,67 @@
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a question, so trivially different spellings share cache entries
+
+    Applies NFC and case folding, collapses whitespace and strips surrounding
+    punctuation such as a trailing '?' or '।'.
+    """
+    query = " ".join(unicodedata.normalize("NFC", query).casefold().split())
+    return query.strip(" ?!.,;:।॥'\"")
+
+class QueryCache:
+    """
+    Thread-safe LRU cache whose entries also expire ttl seconds after being stored
+
+    A max_size of 0 disables caching.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Cached value for key, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl and time.monotonic() - entry[0] > self.ttl):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store value under key, evicting the least recently used entries beyond max_size
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Drop every entry
+        """
+        with self._lock:
+            self._entries.clear()
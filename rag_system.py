@@ -1,9 +1,14 @@
 from pdf_processor import BengaliPDFProcessor
 from vector_database import LegalVectorDatabase
-from gemini_client import GeminiLegalAssistant
+from sharded_database import ShardedLegalDatabase
+from ocr import BengaliOCR
+from dedup import NearDuplicateIndex
+from context_packer import ContextPacker, estimate_tokens, truncate_to_tokens
 from config import Config
 import logging
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Iterator, Tuple
 import os
 from pathlib import Path
 
@@ -11,6 +16,48 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def vector_db_options() -> Dict[str, any]:
+    """
+    LegalVectorDatabase settings from Config, shared by every shard
+    """
+    return dict(
+        embedding_model_name=Config.EMBEDDING_MODEL,
+        embedding_backend=Config.EMBEDDING_BACKEND,
+        onnx_path=Config.ONNX_MODEL_PATH,
+        embedding_threads=Config.EMBEDDING_THREADS,
+        embedding_workers=Config.EMBEDDING_WORKERS,
+        embedding_batch_size=Config.EMBEDDING_BATCH_SIZE,
+        keep_snapshots=Config.INDEX_KEEP_SNAPSHOTS,
+        verify_snapshots=Config.INDEX_VERIFY_SNAPSHOTS,
+        index_factory=Config.INDEX_FACTORY,
+        storage=Config.INDEX_STORAGE,
+        pca_dim=Config.INDEX_PCA_DIM,
+        train_size=Config.INDEX_TRAIN_SIZE,
+        nprobe=Config.INDEX_NPROBE,
+        ef_search=Config.INDEX_EF_SEARCH,
+        embedding_cache_path=Config.EMBEDDING_CACHE_PATH,
+        query_cache_size=Config.QUERY_CACHE_SIZE,
+        query_cache_ttl=Config.QUERY_CACHE_TTL,
+        retrieval_mode=Config.RETRIEVAL_MODE,
+        rrf_k=Config.RRF_K,
+        hybrid_candidates=Config.HYBRID_CANDIDATES,
+        route_documents=Config.ROUTE_DOCUMENTS
+    )
+
+def create_vector_db():
+    """
+    The vector database Config describes: a single index, or a sharded one
+    """
+    if Config.INDEX_SHARDS > 1:
+        return ShardedLegalDatabase(
+            Config.INDEX_SHARDS,
+            db_path=Config.VECTOR_DB_PATH,
+            shard_addresses=Config.SHARD_ADDRESSES,
+            authkey=Config.SHARD_AUTHKEY.encode('utf-8'),
+            **vector_db_options()
+        )
+    return LegalVectorDatabase(db_path=Config.VECTOR_DB_PATH, **vector_db_options())
+
 class BangladeshLegalRAGSystem:
     """
     Complete RAG system for Bangladesh legal assistance
@@ -21,16 +68,51 @@ class BangladeshLegalRAGSystem:
         self.force_rebuild = force_rebuild
         
         # Initialize components
-        self.pdf_processor = BengaliPDFProcessor(Config.PDF_DATA_PATH)
-        self.vector_db = LegalVectorDatabase(
-            embedding_model_name=Config.EMBEDDING_MODEL,
-            db_path=Config.VECTOR_DB_PATH
+        self.pdf_processor = BengaliPDFProcessor(
+            Config.PDF_DATA_PATH,
+            cache_path=Config.TEXT_CACHE_PATH,
+            backend=Config.PDF_BACKEND,
+            ocr=self._create_ocr()
+        )
+        self.vector_db = create_vector_db()
+        self.context_packer = ContextPacker(
+            token_budget=Config.CONTEXT_TOKEN_BUDGET,
+            min_passages=Config.CONTEXT_MIN_PASSAGES,
+            score_gap=Config.CONTEXT_SCORE_GAP,
+            duplicate_threshold=Config.DEDUP_THRESHOLD,
+            num_perm=Config.DEDUP_NUM_PERM,
+            bands=Config.DEDUP_BANDS,
+            shingle_size=Config.DEDUP_SHINGLE_SIZE
         )
         
         # Initialize Gemini client (will be done when needed to avoid API key issues)
         self.gemini_client = None
         self._initialized = False
         
+        # Index snapshots published by other processes are picked up between requests
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_checked = time.monotonic()
+        self._skipped_snapshot = None  # Current snapshot that could not be switched to
+        
+    def _create_ocr(self) -> Optional[BengaliOCR]:
+        """
+        Create the OCR fallback if it is enabled and its dependencies are installed
+        """
+        if not Config.OCR_ENABLED:
+            return None
+        try:
+            return BengaliOCR(
+                cache_path=Config.OCR_CACHE_PATH,
+                language=Config.OCR_LANGUAGE,
+                dpi=Config.OCR_DPI,
+                workers=Config.OCR_WORKERS,
+                min_chars=Config.OCR_MIN_CHARS,
+                min_bengali_ratio=Config.OCR_MIN_BENGALI_RATIO
+            )
+        except Exception as e:
+            logger.warning(f"OCR fallback disabled: {e}")
+            return None
+    
     def initialize_system(self) -> bool:
         """
         Initialize the complete RAG system
@@ -38,30 +120,38 @@ class BangladeshLegalRAGSystem:
         try:
             logger.info("Initializing Bangladesh Legal RAG System...")
             
-            # Try to load existing index first
+            documents = self._scan_documents()
+            
+            # Try to load existing index first and bring it up to date with data/
             if not self.force_rebuild and self.vector_db.load_index():
-                logger.info("Loaded existing vector database")
-                self._initialized = True
-                return True
+                manifest = self.vector_db.load_manifest()
+                if manifest and manifest.get("parameters") == self._build_parameters():
+                    self._update_index(manifest["documents"], documents)
+                    logger.info("Loaded existing vector database")
+                    if Config.EMBEDDING_WARMUP:
+                        self.vector_db.warm_up()
+                    self._initialized = True
+                    return True
+                logger.info("Index manifest missing or build parameters changed")
             
             # If no existing index or force rebuild, process PDFs and build index
             logger.info("Building new vector database from PDF documents...")
             
-            # Process all PDFs
-            document_chunks = self.pdf_processor.process_all_pdfs(
-                chunk_size=Config.CHUNK_SIZE,
-                overlap=Config.CHUNK_OVERLAP
+            # Stream processed PDFs straight into the vector index
+            self.vector_db.build_index(
+                self._iter_documents(documents),
+                batch_size=Config.INDEX_BATCH_SIZE,
+                checkpoint=True,
+                deduplicator=self._create_deduplicator()
             )
             
-            if not document_chunks:
+            if self.vector_db.index is None:
                 logger.error("No documents were processed successfully")
                 return False
             
-            # Build vector index
-            self.vector_db.build_index(document_chunks)
-            
             # Save the index for future use
-            self.vector_db.save_index()
+            self.vector_db.save_index(self._manifest(documents))
+            self.vector_db.clear_checkpoint()
             
             logger.info("System initialization completed successfully")
             self._initialized = True
@@ -71,12 +161,189 @@ class BangladeshLegalRAGSystem:
             logger.error(f"Error initializing system: {e}")
             return False
     
+    def _build_parameters(self) -> Dict[str, any]:
+        """
+        Parameters that invalidate every indexed document when they change
+        """
+        # Configured rather than effective chunk sizes: the effective token size comes
+        # from the embedding model, which a startup with an up-to-date index never loads
+        if Config.CHUNK_UNIT == "tokens":
+            chunk_size, overlap = Config.CHUNK_SIZE_TOKENS, Config.CHUNK_OVERLAP_TOKENS
+        else:
+            chunk_size, overlap = Config.CHUNK_SIZE, Config.CHUNK_OVERLAP
+        return {
+            "embedding_model": self.vector_db.embedding_id,
+            "index_factory": self.vector_db.index_factory,
+            "pdf_backend": Config.PDF_BACKEND,
+            "ocr": self.pdf_processor.ocr.version if self.pdf_processor.ocr else None,
+            "chunk_unit": Config.CHUNK_UNIT,
+            "chunk_size": chunk_size,
+            "chunk_overlap": overlap,
+            "chunker": "spans-v3",
+            "sections": 1,
+            "dedup": [Config.DEDUP_THRESHOLD, Config.DEDUP_NUM_PERM, Config.DEDUP_BANDS, Config.DEDUP_SHINGLE_SIZE]
+                     if Config.DEDUP_ENABLED else None,
+        }
+    
+    def _chunking(self) -> Tuple[int, int, any]:
+        """
+        Effective (chunk_size, overlap, tokenizer); tokenizer is None when chunking by characters
+        """
+        if Config.CHUNK_UNIT != "tokens":
+            return Config.CHUNK_SIZE, Config.CHUNK_OVERLAP, None
+        
+        max_tokens = self.vector_db.max_chunk_tokens()
+        chunk_size = min(Config.CHUNK_SIZE_TOKENS, max_tokens) if Config.CHUNK_SIZE_TOKENS else max_tokens
+        return chunk_size, min(Config.CHUNK_OVERLAP_TOKENS, chunk_size // 2), self.vector_db.get_tokenizer()
+    
+    def _create_deduplicator(self) -> Optional[NearDuplicateIndex]:
+        """
+        Create the near-duplicate detector for an index build, if enabled
+        """
+        if not Config.DEDUP_ENABLED:
+            return None
+        return NearDuplicateIndex(
+            threshold=Config.DEDUP_THRESHOLD,
+            num_perm=Config.DEDUP_NUM_PERM,
+            bands=Config.DEDUP_BANDS,
+            shingle_size=Config.DEDUP_SHINGLE_SIZE
+        )
+    
+    def _scan_documents(self) -> Dict[str, Dict[str, str]]:
+        """
+        Hash every PDF in the data directory, keyed by document name
+        """
+        return {
+            pdf_file.stem: {
+                "file": pdf_file.name,
+                "sha256": self.pdf_processor.compute_file_hash(pdf_file)
+            }
+            for pdf_file in self.pdf_processor.list_pdf_files()
+        }
+    
+    def _iter_documents(self, documents: Dict[str, Dict[str, str]]) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Lazily extract and chunk the given documents
+        """
+        pdf_files = [self.pdf_processor.data_path / doc["file"] for doc in documents.values()]
+        chunk_size, overlap, tokenizer = self._chunking()
+        return self.pdf_processor.iter_processed_documents(
+            pdf_files,
+            chunk_size=chunk_size,
+            overlap=overlap,
+            workers=Config.PDF_WORKERS,
+            pages_per_shard=Config.PDF_PAGES_PER_SHARD,
+            tokenizer=tokenizer,
+            sections=self.vector_db.sections
+        )
+    
+    def _update_index(self, indexed: Dict[str, Dict[str, str]], documents: Dict[str, Dict[str, str]]) -> None:
+        """
+        Re-index added or changed documents and drop removed ones
+        """
+        changed = {
+            name: doc for name, doc in documents.items()
+            if indexed.get(name, {}).get("sha256") != doc["sha256"]
+        }
+        removed = [name for name in indexed if name not in documents]
+        
+        if not changed and not removed:
+            logger.info("Vector database is up to date")
+            return
+        
+        logger.info(f"Updating vector database: {len(changed)} added or changed, {len(removed)} removed")
+        
+        self.vector_db.remove_documents(removed + list(changed))
+        self.vector_db.add_documents(
+            self._iter_documents(changed),
+            batch_size=Config.INDEX_BATCH_SIZE,
+            checkpoint=True,
+            deduplicator=self._create_deduplicator()
+        )
+        
+        self.vector_db.save_index(self._manifest(documents))
+        self.vector_db.clear_checkpoint()
+    
+    def _manifest(self, documents: Dict[str, Dict[str, str]]) -> Dict[str, any]:
+        """
+        Build manifest saved with the index: the indexed documents and build parameters
+        """
+        return {
+            "parameters": self._build_parameters(),
+            "documents": documents
+        }
+    
+    def refresh_index(self, force: bool = False) -> bool:
+        """
+        Switch to a newer index snapshot, if one has been published since loading
+        
+        Request handlers call this at most every Config.INDEX_RELOAD_INTERVAL
+        seconds; the check and the load then run on a background thread and the
+        request carries on with the current index. The new snapshot is loaded next
+        to the current database and the reference is swapped in one step once it
+        is ready, so no request waits for a load or sees a half-loaded index. A
+        snapshot built with other parameters (e.g. another embedding model) is not
+        swapped in.
+        
+        force=True checks and loads in the calling thread and returns True if the
+        index changed; otherwise returns False.
+        """
+        if not self._initialized:
+            return False
+        if force:
+            with self._snapshot_lock:
+                return self._switch_snapshot()
+        
+        if Config.INDEX_RELOAD_INTERVAL <= 0 or \
+                time.monotonic() - self._snapshot_checked < Config.INDEX_RELOAD_INTERVAL:
+            return False
+        # Only one reload at a time; it releases the lock when done
+        if not self._snapshot_lock.acquire(blocking=False):
+            return False
+        self._snapshot_checked = time.monotonic()
+        threading.Thread(target=self._switch_snapshot_in_background, name="index-reload", daemon=True).start()
+        return False
+    
+    def _switch_snapshot_in_background(self) -> None:
+        try:
+            self._switch_snapshot()
+        except Exception as e:
+            logger.error(f"Error reloading the index: {e}")
+        finally:
+            self._snapshot_lock.release()
+    
+    def _switch_snapshot(self) -> bool:
+        """
+        Load the current snapshot if it is new and swap it in; the caller holds _snapshot_lock
+        """
+        self._snapshot_checked = time.monotonic()
+        current = self.vector_db.current_snapshot()
+        if current in (None, self.vector_db.snapshot, self._skipped_snapshot):
+            return False
+        
+        vector_db = self.vector_db.open_current_snapshot()
+        if vector_db is None or vector_db.snapshot != current:
+            logger.warning(f"Index snapshot {current} could not be loaded")
+            self._skipped_snapshot = current
+            return False
+        manifest = vector_db.load_manifest()
+        if not manifest or manifest.get("parameters") != self._build_parameters():
+            logger.warning(f"Not switching to index snapshot {current}: build parameters differ")
+            self._skipped_snapshot = current
+            return False
+        
+        self.vector_db = vector_db
+        logger.info(f"Switched to index snapshot {vector_db.snapshot}")
+        return True
+    
     def _ensure_gemini_client(self) -> bool:
         """
         Ensure Gemini client is initialized
         """
         if self.gemini_client is None:
             try:
+                # Imported here so starting the system does not load the Gemini SDK
+                from gemini_client import GeminiLegalAssistant
                 self.gemini_client = GeminiLegalAssistant(self.api_key)
                 return True
             except Exception as e:
@@ -100,15 +367,28 @@ class BangladeshLegalRAGSystem:
                 "error": "Gemini AI সেবা ব্যবহার করতে সমস্যা হচ্ছে। API key যাচাই করুন।"
             }
         
+        self.refresh_index()
+        vector_db = self.vector_db  # One snapshot for the whole request
+        
         try:
             # Get relevant context from vector database
             context = ""
             relevant_docs = []
             
             if use_context:
-                search_results = self.vector_db.search(query, top_k=Config.TOP_K_RETRIEVAL)
-                relevant_docs = search_results
-                context = self.vector_db.get_context_for_query(query, top_k=Config.TOP_K_RETRIEVAL)
+                # Put the exact text of a cited section first
+                citation = vector_db.lookup_section(query)
+                citation_budget = int(Config.CONTEXT_TOKEN_BUDGET * Config.CONTEXT_CITATION_SHARE)
+                citation_text = self._format_citation(citation, citation_budget) if citation else ""
+                
+                # One retrieval pass serves both the sources and the context; the packed
+                # passages fill what the citation leaves of the token budget
+                candidates = vector_db.search(query, top_k=Config.CONTEXT_CANDIDATES)
+                relevant_docs = self.context_packer.pack(
+                    candidates, Config.CONTEXT_TOKEN_BUDGET - estimate_tokens(citation_text))
+                context = vector_db.format_context(relevant_docs)
+                if citation_text:
+                    context = citation_text + "\n" + context
             
             # Generate legal advice using Gemini
             advice = self.gemini_client.generate_legal_advice(query, context)
@@ -129,6 +409,44 @@ class BangladeshLegalRAGSystem:
                 "error": f"পরামর্শ তৈরি করতে সমস্যা হয়েছে: {str(e)}"
             }
     
+    def lookup_citation(self, citation: str) -> Dict[str, any]:
+        """
+        Get the text of a cited section or article, e.g. "সংবিধান অনুচ্ছেদ ২৭", without vector search
+        """
+        if not self._initialized:
+            return {
+                "success": False,
+                "error": "সিস্টেম এখনো প্রস্তুত নয়। অনুগ্রহ করে প্রথমে সিস্টেম ইনিশিয়ালাইজ করুন।"
+            }
+        
+        self.refresh_index()
+        section = self.vector_db.lookup_section(citation)
+        if section is None:
+            return {
+                "success": False,
+                "error": "উল্লিখিত ধারা বা অনুচ্ছেদটি খুঁজে পাওয়া যায়নি।"
+            }
+        
+        return {"success": True, **section}
+    
+    def _format_citation(self, section: Dict, token_budget: int) -> str:
+        """
+        Format a looked-up section for the prompt context, cut to about token_budget estimated tokens
+        """
+        location = f"ধারা/অনুচ্ছেদ {section['section']}"
+        if section.get('page_start'):
+            location += f", পৃষ্ঠা {section['page_start']}"
+            if section.get('page_end') != section['page_start']:
+                location += f"-{section['page_end']}"
+        header = f"=== {section['document']} ({location}) [উদ্ধৃত ধারা] ==="
+        text = section['text']
+        if estimate_tokens(header + text) > token_budget:
+            text = truncate_to_tokens(text, token_budget - estimate_tokens(header) - 1) + " ..."
+        return f"""
+{header}
+{text}
+"""
+    
     def search_documents(self, query: str, document_name: Optional[str] = None) -> List[Dict]:
         """
         Search specific documents or all documents
@@ -136,6 +454,7 @@ class BangladeshLegalRAGSystem:
         if not self._initialized:
             return []
         
+        self.refresh_index()
         try:
             if document_name:
                 return self.vector_db.search_by_document(document_name, query, top_k=5)
@@ -152,6 +471,7 @@ class BangladeshLegalRAGSystem:
         if not self._initialized:
             return {}
         
+        self.refresh_index()
         return self.vector_db.get_document_info()
     
     def generate_legal_document(self, document_type: str, details: Dict[str, str]) -> Dict[str, any]:
@@ -221,6 +541,7 @@ class BangladeshLegalRAGSystem:
         if self._initialized:
             status["documents_available"] = self.get_available_documents()
             status["vector_db_status"] = f"Loaded with {sum(status['documents_available'].values())} chunks"
+            status["index_snapshot"] = self.vector_db.snapshot
         
         if self._ensure_gemini_client():
             gemini_status = self.gemini_client.check_api_status()
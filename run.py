@@ -24,12 +24,23 @@ def main():
             print("🧪 Testing system...")
             subprocess.run([sys.executable, "rag_system.py"])
             
+        elif command == 'benchmark':
+            print("⏱️ Running benchmark...")
+            subprocess.run([sys.executable, "benchmark.py"] + sys.argv[2:])
+            
+        elif command == 'shards':
+            print("🗂️ Starting shard servers...")
+            try:
+                subprocess.run([sys.executable, "shard_server.py", "--launch"] + sys.argv[2:])
+            except KeyboardInterrupt:
+                print("\n👋 Shard servers stopped")
+            
         elif command == 'clean':
             print("🧹 Cleaning cache...")
             import shutil
             from pathlib import Path
             
-            dirs_to_clean = ["vector_db", "__pycache__", ".streamlit"]
+            dirs_to_clean = ["vector_db", "text_cache", "embedding_cache", "onnx_models", "__pycache__", ".streamlit"]
             for dir_path in dirs_to_clean:
                 if Path(dir_path).exists():
                     shutil.rmtree(dir_path)
@@ -41,6 +52,8 @@ Available commands:
   start    - Start the application (default)
   setup    - Run system setup
   test     - Test the system
+  benchmark - Run a benchmark (see: python run.py benchmark --help)
+  shards   - Start shard servers for INDEX_SHARDS > 1
   clean    - Clean cache files
   help     - Show this help
             """)
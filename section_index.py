@@ -0,0 +1,210 @@
+import re
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+from bm25_index import tokenize_bengali
+from chunk_store import _replace_atomically
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_BENGALI_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+
+# A section / article number ending its heading: "২৭।", "৭ক৷" or, in SutonnyMJ-encoded
+# PDFs, "16K|". Clause numbers such as "(১)" and parts of longer numbers are skipped.
+_HEADING_PATTERN = re.compile(r"(?<![\d০-৯(])([০-৯0-9]{1,3})([অ-হA-Z])?\s*[।৷|]")
+
+# Largest jump between consecutive section numbers, for repealed or unrecognized headings
+_MAX_GAP = 5
+
+# A citation in a question: "অনুচ্ছেদ ২৭", "ধারা ৪২০ক", "৪২০ ধারা", "section 10"
+_CITATION_PATTERN = re.compile(
+    r"(?:ধারা|অনুচ্ছেদ|section|article|sec\.?|art\.?)\s*(?:নং|নম্বর|no\.?)?\s*([০-৯0-9]{1,3}[অ-হ]?)(?![০-৯0-9])"
+    r"|(?<![০-৯0-9])([০-৯0-9]{1,3}[অ-হ]?)\s*(?:নং|নম্বর)?\s*(?:ধারা|অনুচ্ছেদ)",
+    re.IGNORECASE)
+
+SECTIONS_FILE = "sections.json"
+
+# Longest heading kept per section
+_HEADING_LENGTH = 120
+
+def section_label(number: str) -> str:
+    """
+    Canonical section label: ASCII digits plus any letter suffix, e.g. "৭ক" -> "7ক"
+    """
+    return number.translate(_BENGALI_DIGITS).strip()
+
+def find_sections(text: str) -> List[Tuple[str, int, int]]:
+    """
+    (label, char_start, char_end) of every numbered section / article in a document
+
+    Headings must number upwards in small steps, which filters out dates and
+    amounts that also end in a danda. Numbering that restarts at 1, as after a
+    table of contents, starts a new run; the run with the most headings wins, the
+    later one on a tie.
+    """
+    runs = []
+    run = []
+    last = 0
+    for match in _HEADING_PATTERN.finditer(text):
+        number = int(match.group(1).translate(_BENGALI_DIGITS))
+        suffix = match.group(2)
+        if suffix:
+            accepted = bool(run) and number in (last, last + 1)
+        elif number == 1 and run:
+            runs.append(run)
+            run = []
+            accepted = True
+        else:
+            accepted = last < number <= last + _MAX_GAP
+        if accepted:
+            run.append((section_label(match.group(1) + (suffix or "")), match.start()))
+            last = number
+    if run:
+        runs.append(run)
+    if not runs:
+        return []
+
+    run_index = max(range(len(runs)), key=lambda i: (len(runs[i]), i))
+    best = runs[run_index]
+    run_end = runs[run_index + 1][0][1] if run_index + 1 < len(runs) else len(text)
+
+    sections = []
+    seen = set()
+    for i, (label, start) in enumerate(best):
+        end = best[i + 1][1] if i + 1 < len(best) else run_end
+        if label not in seen:
+            seen.add(label)
+            sections.append((label, start, end))
+    return sections
+
+def assemble_text(start: int, end: int, pieces: Iterable[Tuple[int, int, str]]) -> str:
+    """
+    Document text between start and end, pieced together from (char_start, char_end, text) chunks
+
+    Overlapping chunks contribute their overlap once; a gap no chunk covers becomes a space.
+    """
+    parts = []
+    position = start
+    for piece_start, piece_end, text in sorted(pieces):
+        if piece_end <= position or piece_start >= end:
+            continue
+        if piece_start > position:
+            parts.append(" ")
+            position = piece_start
+        parts.append(text[position - piece_start:min(end, piece_end) - piece_start])
+        position = min(end, piece_end)
+        if position >= end:
+            break
+    return "".join(parts).strip()
+
+class SectionIndex:
+    """
+    Table of statute sections / articles per document
+
+    Maps (document, section label) to the section's character span, heading, pages
+    and the chunk_index of every chunk overlapping it, so a citation resolves with
+    a dictionary lookup instead of a vector search. The section text itself is not
+    kept; it is cut from those chunks when needed (see assemble_text).
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, Dict[str, Dict]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(sections) for sections in self.documents.values())
+
+    def add_document(self, document: str, text: str, chunks: List[Dict],
+                     page_range=None) -> int:
+        """
+        Parse a document's sections; chunks need 'char_start' / 'char_end' to be linked
+
+        page_range(start, end) -> (page_start, page_end) adds page provenance.
+        Returns the number of sections found.
+        """
+        sections = {}
+        for label, start, end in find_sections(text):
+            entry = {
+                'heading': text[start:min(end, start + _HEADING_LENGTH)].strip().split("\n", 1)[0],
+                'char_start': start,
+                'char_end': end,
+                'chunks': [i for i, chunk in enumerate(chunks)
+                           if chunk.get('char_start', end) < end and chunk.get('char_end', start) > start]
+            }
+            if page_range is not None:
+                entry['page_start'], entry['page_end'] = page_range(start, end)
+            sections[label] = entry
+
+        if sections:
+            self.documents[document] = sections
+        else:
+            self.documents.pop(document, None)
+        return len(sections)
+
+    def clear(self) -> None:
+        """
+        Drop every document's sections
+        """
+        self.documents.clear()
+
+    def remove_documents(self, document_names: List[str]) -> None:
+        """
+        Drop the sections of the given documents
+        """
+        for name in document_names:
+            self.documents.pop(name, None)
+
+    def get(self, document: str, number: str) -> Optional[Dict]:
+        """
+        Section entry for a document and section number (Bengali or ASCII digits)
+        """
+        return self.documents.get(document, {}).get(section_label(number))
+
+    def resolve(self, citation: str) -> Optional[Tuple[str, str, Dict]]:
+        """
+        Find the section a citation such as "সংবিধান অনুচ্ছেদ ২৭" refers to
+
+        The document is the one whose name shares the most words with the rest of
+        the citation; without any shared word the citation only resolves if a single
+        document has that section. Returns (document, label, entry) or None.
+        """
+        match = _CITATION_PATTERN.search(citation)
+        if not match:
+            return None
+        label = section_label(match.group(1) or match.group(2))
+
+        candidates = [name for name, sections in self.documents.items() if label in sections]
+        if not candidates:
+            return None
+
+        words = set(tokenize_bengali(citation[:match.start()] + " " + citation[match.end():]))
+        overlap = {name: len(words & set(tokenize_bengali(name))) for name in candidates}
+        best = max(candidates, key=lambda name: overlap[name])
+        if not overlap[best] and len(candidates) > 1:
+            return None
+        return best, label, self.documents[best][label]
+
+    def save(self, db_path: Path) -> None:
+        """
+        Write the table next to the vector index
+        """
+        data = json.dumps(self.documents, ensure_ascii=False)
+        _replace_atomically(db_path / SECTIONS_FILE, lambda f: f.write(data.encode('utf-8')))
+
+    @classmethod
+    def load(cls, db_path: Path) -> "SectionIndex":
+        """
+        Read a saved table; empty if there is none
+        """
+        index = cls()
+        sections_file = db_path / SECTIONS_FILE
+        if sections_file.exists():
+            with open(sections_file, 'r', encoding='utf-8') as f:
+                index.documents = json.load(f)
+            # Tables saved by earlier versions also held every section's text
+            for sections in index.documents.values():
+                for entry in sections.values():
+                    entry.pop('text', None)
+        return index
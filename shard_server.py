@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Shard server for the sharded index (Config.INDEX_SHARDS > 1)
+
+Serves searches over one shard of VECTOR_DB_PATH to ShardedLegalDatabase
+coordinators configured with SHARD_ADDRESSES. The index is built and updated by
+the application as usual; servers load each snapshot a coordinator asks for.
+
+Usage:
+    python shard_server.py --launch                  # one server per shard on SHARD_BASE_PORT + i
+    python shard_server.py --shard 0 [--host 127.0.0.1] [--port 6100]
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from multiprocessing.connection import Listener
+from pathlib import Path
+from typing import Tuple
+
+from config import Config
+from rag_system import vector_db_options
+from sharded_database import SHARD_METHODS
+from vector_database import LegalVectorDatabase
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ShardServer:
+    """
+    Answers shard search calls for one shard directory
+
+    Every call names the snapshot to search, so coordinators that loaded
+    different generations are each answered from their own. The most recently
+    used snapshots stay loaded (memory-mapped); older ones are dropped.
+    """
+
+    def __init__(self, shard_path: str, keep_loaded: int = 2):
+        # Template for the loaded snapshots; searches take query vectors, so its model is never loaded
+        self.database = LegalVectorDatabase(db_path=shard_path, **vector_db_options())
+        self.keep_loaded = keep_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _open(self, snapshot: str) -> LegalVectorDatabase:
+        with self._lock:
+            database = self._loaded.get(snapshot)
+            if database is not None:
+                self._loaded.move_to_end(snapshot)
+                return database
+        
+        # Load without the lock, so other connections keep searching loaded snapshots meanwhile
+        database = self.database.open_current_snapshot(snapshot=snapshot)
+        if database is None:
+            raise RuntimeError(f"Snapshot {snapshot} of {self.database.db_path} cannot be loaded")
+        
+        with self._lock:
+            # Another connection may have loaded the same snapshot in the meantime
+            database = self._loaded.setdefault(snapshot, database)
+            self._loaded.move_to_end(snapshot)
+            while len(self._loaded) > self.keep_loaded:
+                self._loaded.popitem(last=False)
+        return database
+
+    def handle(self, connection) -> None:
+        """
+        Answer (method, snapshot, args) requests on one connection until it closes
+        """
+        with connection:
+            while True:
+                try:
+                    method, snapshot, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+
+                try:
+                    if method not in SHARD_METHODS:
+                        raise ValueError(f"Unknown shard method {method}")
+                    response = ("ok", getattr(self._open(snapshot), method)(*args))
+                except Exception as e:
+                    logger.error(f"Shard request {method} failed: {e}")
+                    response = ("error", str(e))
+                connection.send(response)
+
+    def serve(self, address: Tuple[str, int], authkey: bytes) -> None:
+        """
+        Accept coordinator connections forever, one thread per connection
+        
+        Requests are unpickled, so connections must authenticate with authkey.
+        """
+        if not authkey:
+            raise ValueError("Shard servers need an authkey (set SHARD_AUTHKEY)")
+        with Listener(address, authkey=authkey) as listener:
+            logger.info(f"Serving {self.database.db_path} on {address[0]}:{address[1]}")
+            while True:
+                try:
+                    connection = listener.accept()
+                except Exception as e:  # Failed authentication or a dropped handshake
+                    logger.warning(f"Rejected shard connection: {e}")
+                    continue
+                threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+
+def shard_path(shard: int) -> str:
+    return str(Path(Config.VECTOR_DB_PATH) / f"shard_{shard:02d}")
+
+def launch(shards: int, host: str, base_port: int) -> None:
+    """
+    Start one server process per shard and wait for them
+    """
+    processes = [
+        subprocess.Popen([sys.executable, __file__, "--shard", str(i), "--host", host, "--port", str(base_port + i)])
+        for i in range(shards)
+    ]
+    addresses = ",".join(f"{host}:{base_port + i}" for i in range(shards))
+    print(f"Started {shards} shard servers; run the application with INDEX_SHARDS={shards} SHARD_ADDRESSES={addresses}")
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve shards of the legal document index")
+    parser.add_argument("--shard", type=int, help="Shard number to serve")
+    parser.add_argument("--launch", action="store_true", help="Start a server for every shard")
+    parser.add_argument("--shards", type=int, default=Config.INDEX_SHARDS)
+    parser.add_argument("--host", default=Config.SHARD_HOST)
+    parser.add_argument("--port", type=int, help="Defaults to SHARD_BASE_PORT + shard")
+    args = parser.parse_args()
+
+    if not Config.SHARD_AUTHKEY:
+        parser.error("Set the SHARD_AUTHKEY environment variable to a secret shared with the application")
+    if args.launch:
+        if args.shards < 2:
+            parser.error("Set INDEX_SHARDS (or --shards) to 2 or more")
+        launch(args.shards, args.host, Config.SHARD_BASE_PORT)
+    elif args.shard is not None:
+        port = args.port if args.port is not None else Config.SHARD_BASE_PORT + args.shard
+        ShardServer(shard_path(args.shard)).serve((args.host, port), Config.SHARD_AUTHKEY.encode('utf-8'))
+    else:
+        parser.error("Give --shard N or --launch")
+
+if __name__ == "__main__":
+    main()
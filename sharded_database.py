@@ -0,0 +1,494 @@
+import copy
+import json
+import queue
+import threading
+import unicodedata
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Client
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import numpy as np
+from vector_database import LegalVectorDatabase, DocumentChunks
+from query_cache import QueryCache, normalize_query
+from bm25_index import tokenize_bengali
+from dedup import NearDuplicateIndex
+from chunk_store import _replace_atomically
+from context_packer import ContextPacker
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Which snapshot of every shard makes up the current generation, plus the build manifest
+SHARDS_FILE = "shards.json"
+
+# Methods a shard server answers; queries arrive as embeddings, so shards never load the model
+SHARD_METHODS = ("search_vectors", "search_lexical", "search_document_vector", "lookup_section", "get_document_info")
+
+def shard_of(document: str, shard_count: int) -> int:
+    """
+    Shard holding a document: a stable hash of its name, the same in every process
+    """
+    return zlib.crc32(unicodedata.normalize("NFC", document).encode('utf-8')) % shard_count
+
+def merge_results(result_lists: List[List[Dict]], top_k: int) -> List[Dict]:
+    """
+    Merge per-shard rankings into one top_k by score, ranked again from 1
+    """
+    merged = sorted((result for results in result_lists for result in results),
+                    key=lambda result: (-result['score'], result['document'], result['chunk_index']))[:top_k]
+    for rank, result in enumerate(merged, 1):
+        result['rank'] = rank
+    return merged
+
+def read_shards_file(db_path: Path) -> Optional[Dict]:
+    """
+    The current generation: {'generation', 'snapshots', 'manifest'}, or None before the first save
+    """
+    try:
+        with open(db_path / SHARDS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+class RemoteShard:
+    """
+    Client for a shard served by shard_server.py, with the shard search methods of LegalVectorDatabase
+
+    Every calling thread keeps its own connection. Each call names the snapshot
+    the coordinator loaded, so all shards answer from the same generation even
+    while a newer one is being published.
+    """
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes, snapshot: str):
+        self.address = address
+        self.authkey = authkey
+        self.snapshot = snapshot
+        self._local = threading.local()
+
+    def _call(self, method: str, *args):
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            try:
+                if connection is None:
+                    connection = self._local.connection = Client(self.address, authkey=self.authkey)
+                connection.send((method, self.snapshot, args))
+                status, value = connection.recv()
+                break
+            except (EOFError, OSError):
+                # The server restarted or dropped the connection; reconnect once
+                self._local.connection = None
+                if attempt:
+                    raise
+        if status != "ok":
+            raise RuntimeError(f"Shard {self.address[0]}:{self.address[1]}: {value}")
+        return value
+
+    def search_vectors(self, vectors: np.ndarray, top_k: int = 5) -> List[List[Dict]]:
+        return self._call("search_vectors", vectors, top_k)
+
+    def search_lexical(self, query: str, top_k: int = 5, vector: Optional[np.ndarray] = None) -> List[Dict]:
+        return self._call("search_lexical", query, top_k, vector)
+
+    def search_document_vector(self, document_name: str, vector: np.ndarray, top_k: int = 3) -> List[Dict]:
+        return self._call("search_document_vector", document_name, vector, top_k)
+
+    def lookup_section(self, citation: str) -> Optional[Dict]:
+        return self._call("lookup_section", citation)
+
+    def get_document_info(self) -> Dict[str, int]:
+        return self._call("get_document_info")
+
+class _ShardedSections:
+    """
+    Routes the section tables parsed while indexing to the shard that holds each document
+    """
+
+    def __init__(self, shards: List[LegalVectorDatabase]):
+        self.shards = shards
+
+    def add_document(self, document: str, text: str, chunks: List[Dict], page_range=None) -> int:
+        shard = self.shards[shard_of(document, len(self.shards))]
+        return shard.sections.add_document(document, text, chunks, page_range)
+
+class ShardedLegalDatabase:
+    """
+    Corpus split across several LegalVectorDatabase shards, searched in parallel
+
+    Whole documents are assigned to shards by a stable hash of their name, so
+    per-document work (filtered search, section lookup, near-duplicate merging,
+    updates) stays within one shard. A search embeds the query once, fans out to
+    every shard on a thread pool (FAISS releases the GIL while searching) and
+    merges the per-shard top_k into one ranking in the usual result format.
+    Hybrid retrieval fuses the merged dense and BM25 rankings here, so reciprocal
+    ranks are global; BM25 term statistics stay per shard.
+
+    Shard i lives in db_path/shard_0i with its own snapshots. shards.json names
+    the snapshot of every shard that belongs to the current generation and is
+    replaced only after all shards are saved, so readers load a consistent set.
+    With shard_addresses, searches go to shard_server.py processes instead of
+    in-process shards; index builds and updates still run here.
+    """
+
+    def __init__(self, shard_count: int, db_path: str = "./vector_db",
+                 shard_addresses: Optional[List[Tuple[str, int]]] = None, authkey: bytes = b"",
+                 **database_options):
+        if shard_addresses and len(shard_addresses) != shard_count:
+            raise ValueError(f"{shard_count} shards need {shard_count} shard addresses, got {len(shard_addresses)}")
+        if shard_addresses and not authkey:
+            # Shard replies are unpickled, so only talk to servers that share a secret key
+            raise ValueError("Remote shards need an authkey (set SHARD_AUTHKEY)")
+        self.shard_count = shard_count
+        self.db_path = Path(db_path)
+        self.db_path.mkdir(exist_ok=True)
+        self.shard_addresses = shard_addresses or []
+        self.authkey = authkey
+
+        self.shards = [LegalVectorDatabase(db_path=str(self.db_path / f"shard_{i:02d}"), **database_options)
+                       for i in range(shard_count)]
+        for shard in self.shards[1:]:
+            shard.share_embeddings(self.shards[0])  # One model, query cache and embedding cache for all shards
+        self.sections = _ShardedSections(self.shards)
+
+        first = self.shards[0]
+        self.embedding_id = first.embedding_id
+        self.index_factory = first.index_factory
+        self.retrieval_mode = first.retrieval_mode
+        self.rrf_k = first.rrf_k
+        self.hybrid_candidates = first.hybrid_candidates
+        self._search_results = QueryCache(first._search_results.max_size, first._search_results.ttl)
+        self._pool = ThreadPoolExecutor(max_workers=shard_count, thread_name_prefix="shard-search")
+
+        self.snapshot = None  # Name of the loaded generation
+        self._snapshots: List[Optional[str]] = [None] * shard_count
+        self._manifest = None
+        self._readers = {}  # Shard number -> LegalVectorDatabase or RemoteShard, for shards with an index
+
+    @property
+    def index(self):
+        """
+        The shard indexes, or None if no shard has one
+        """
+        return [shard.index for shard in self.shards if shard.index is not None] or None
+
+    def load_index(self, use_mmap: bool = True) -> bool:
+        """
+        Load the shards of the current generation
+
+        With shard addresses only shards.json is read; the shard servers hold the
+        indexes and the local shards are loaded only when the index is modified.
+        """
+        info = read_shards_file(self.db_path)
+        if info is None:
+            logger.warning("Index files not found")
+            return False
+        if len(info['snapshots']) != self.shard_count:
+            logger.warning(f"Index has {len(info['snapshots'])} shards, {self.shard_count} configured")
+            return False
+
+        if not self.shard_addresses:
+            for shard, snapshot in zip(self.shards, info['snapshots']):
+                if snapshot is not None and not shard.load_index(use_mmap, snapshot):
+                    return False
+        self._use_generation(info)
+        logger.info(f"Loaded {self.shard_count} shards, generation {self.snapshot}")
+        return True
+
+    def _use_generation(self, info: Dict) -> None:
+        self.snapshot = f"g{info['generation']:06d}"
+        self._snapshots = list(info['snapshots'])
+        self._manifest = info.get('manifest')
+        self._search_results.clear()
+        if self.shard_addresses:
+            self._readers = {i: RemoteShard(tuple(self.shard_addresses[i]), self.authkey, snapshot)
+                             for i, snapshot in enumerate(self._snapshots) if snapshot is not None}
+        else:
+            self._readers = {i: shard for i, shard in enumerate(self.shards) if shard.index is not None}
+
+    def _ensure_local(self) -> None:
+        """
+        Load the local shards before modifying them, when searches are served remotely
+        """
+        for shard, snapshot in zip(self.shards, self._snapshots):
+            if shard.index is None and snapshot is not None:
+                if not shard.load_index(snapshot=snapshot):
+                    raise RuntimeError(f"Could not load snapshot {snapshot} of {shard.db_path}")
+
+    def load_manifest(self) -> Optional[Dict]:
+        """
+        The build manifest saved with the loaded generation
+        """
+        return self._manifest
+
+    def build_index(self, document_chunks: DocumentChunks, batch_size: int = 256,
+                    checkpoint: bool = False, deduplicator: Optional[NearDuplicateIndex] = None) -> None:
+        """
+        Build every shard from document chunks, each document going to its shard
+        """
+        logger.info(f"Building {self.shard_count} index shards...")
+        for shard in self.shards:
+            shard.clear_index()
+        self._route(document_chunks, batch_size, checkpoint, deduplicator)
+
+    def add_documents(self, document_chunks: DocumentChunks, batch_size: int = 256,
+                      checkpoint: bool = False, deduplicator: Optional[NearDuplicateIndex] = None) -> int:
+        """
+        Add documents to the shards that hold them; returns the number of documents added
+        """
+        self._ensure_local()
+        added = self._route(document_chunks, batch_size, checkpoint, deduplicator)
+        self._search_results.clear()
+        return added
+
+    def _route(self, document_chunks: DocumentChunks, batch_size: int, checkpoint: bool,
+               deduplicator: Optional[NearDuplicateIndex]) -> int:
+        """
+        Stream documents to per-shard add_documents calls running in parallel threads
+
+        document_chunks is consumed once; every shard thread reads its documents
+        from a short queue, so memory stays bounded as in a single-shard build.
+        Each shard gets its own copy of the (empty) deduplicator.
+        """
+        if isinstance(document_chunks, dict):
+            document_chunks = document_chunks.items()
+
+        queues = [queue.Queue(maxsize=2) for _ in self.shards]
+        with ThreadPoolExecutor(max_workers=self.shard_count, thread_name_prefix="shard-build") as pool:
+            futures = [pool.submit(shard.add_documents, iter(documents.get, None), batch_size, checkpoint,
+                                   copy.deepcopy(deduplicator))
+                       for shard, documents in zip(self.shards, queues)]
+            try:
+                for document in document_chunks:
+                    shard_number = shard_of(document[0], self.shard_count)
+                    while True:
+                        try:
+                            queues[shard_number].put(document, timeout=1)
+                            break
+                        except queue.Full:
+                            if futures[shard_number].done():
+                                futures[shard_number].result()  # Raises the shard's error
+            finally:
+                for documents, future in zip(queues, futures):
+                    if not future.done():
+                        documents.put(None)
+            return sum(future.result() for future in futures)
+
+    def remove_documents(self, document_names: List[str]) -> int:
+        """
+        Remove documents from the shards that hold them
+        """
+        self._ensure_local()
+        by_shard = {}
+        for name in document_names:
+            by_shard.setdefault(shard_of(name, self.shard_count), []).append(name)
+        removed = sum(self.shards[i].remove_documents(names) for i, names in by_shard.items())
+        # Even with no rows removed, surviving duplicates may now name other documents
+        self._search_results.clear()
+        return removed
+
+    def save_index(self, manifest: Optional[Dict] = None) -> None:
+        """
+        Save every shard as a new snapshot, then publish the new generation in shards.json
+        """
+        snapshots = []
+        for shard in self.shards:
+            if shard.index is not None:
+                shard.save_index()
+            snapshots.append(shard.snapshot if shard.index is not None else None)
+
+        info = read_shards_file(self.db_path)
+        info = {
+            'generation': (info['generation'] if info else 0) + 1,
+            'snapshots': snapshots,
+            'manifest': manifest
+        }
+        data = json.dumps(info, ensure_ascii=False, indent=2)
+        _replace_atomically(self.db_path / SHARDS_FILE, lambda f: f.write(data.encode('utf-8')))
+        self._use_generation(info)
+        logger.info(f"Published index generation {self.snapshot}")
+
+    def clear_checkpoint(self) -> None:
+        """
+        Delete the batch checkpoints of every shard
+        """
+        for shard in self.shards:
+            shard.clear_checkpoint()
+
+    def current_snapshot(self) -> Optional[str]:
+        """
+        Name of the generation the last save, in this or another process, published
+        """
+        info = read_shards_file(self.db_path)
+        return f"g{info['generation']:06d}" if info else None
+
+    def open_current_snapshot(self, use_mmap: bool = True) -> Optional["ShardedLegalDatabase"]:
+        """
+        A new sharded database over the current generation, sharing this one's embedding model
+        """
+        info = read_shards_file(self.db_path)
+        if info is None or len(info['snapshots']) != self.shard_count:
+            return None
+
+        database = copy.copy(self)
+        database.shards = [shard.empty_copy() for shard in self.shards]
+        database.sections = _ShardedSections(database.shards)
+        database._search_results = QueryCache(self._search_results.max_size, self._search_results.ttl)
+        if not self.shard_addresses:
+            for shard, snapshot in zip(database.shards, info['snapshots']):
+                if snapshot is not None and not shard.load_index(use_mmap, snapshot):
+                    return None
+        database._use_generation(info)
+        return database
+
+    @property
+    def embedding_model_loaded(self) -> bool:
+        return self.shards[0].embedding_model_loaded
+
+    def warm_up(self) -> threading.Thread:
+        """
+        Load the shared embedding model in a background thread
+        """
+        return self.shards[0].warm_up()
+
+    def get_tokenizer(self):
+        return self.shards[0].get_tokenizer()
+
+    def max_chunk_tokens(self) -> int:
+        return self.shards[0].max_chunk_tokens()
+
+    def _submit(self, method: str, *args) -> Dict[int, Future]:
+        return {i: self._pool.submit(getattr(reader, method), *args) for i, reader in self._readers.items()}
+
+    def _fan_out(self, method: str, *args) -> Dict[int, any]:
+        """
+        Call a method on every shard with an index in parallel; results by shard number
+        """
+        return {i: future.result() for i, future in self._submit(method, *args).items()}
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        Search all shards for relevant chunks
+        """
+        return self.search_batch([query], top_k)[0]
+
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        Search for several queries in the configured retrieval mode, embedding them in one batch
+        """
+        if self.retrieval_mode != "hybrid":
+            return self.dense_search_batch(queries, top_k)
+        self.shards[0].embed_queries(queries)  # hybrid_search finds them in the shared query-embedding cache
+        return [self.hybrid_search(query, top_k) for query in queries]
+
+    def dense_search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        Dense search for several queries, embedded once and searched on all shards in parallel
+        """
+        cache_keys = [(normalize_query(query), top_k) for query in queries]
+        batch_results = [self._search_results.get(key) for key in cache_keys]
+
+        missing = {}
+        for query, key, results in zip(queries, cache_keys, batch_results):
+            if results is None:
+                missing.setdefault(key, query)
+
+        if missing:
+            vectors = self.shards[0].embed_queries(list(missing.values()))
+            shard_results = list(self._fan_out("search_vectors", vectors, top_k).values())
+            found = {}
+            for position, key in enumerate(missing):
+                found[key] = merge_results([results[position] for results in shard_results], top_k)
+                self._search_results.put(key, found[key])
+            batch_results = [found[key] if results is None else results
+                             for key, results in zip(cache_keys, batch_results)]
+
+        return [[dict(result) for result in results] for results in batch_results]
+
+    def search_lexical(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        BM25 search on all shards, merged by score
+        """
+        return merge_results(list(self._fan_out("search_lexical", query, top_k).values()), top_k)
+
+    def hybrid_search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        Reciprocal rank fusion of the merged BM25 and dense rankings of all shards
+        
+        As in LegalVectorDatabase.hybrid_search, results are ordered by 'fused_score'
+        and 'score' is the cosine similarity to the query.
+        """
+        cache_key = (normalize_query(query), top_k, "hybrid")
+        results = self._search_results.get(cache_key)
+        if results is None:
+            candidates = max(self.hybrid_candidates, top_k)
+            vector = self.shards[0].embed_query(query)
+            # Shards report the similarity of BM25-only rows as 'dense_score'
+            lexical_futures = self._submit("search_lexical", query, candidates, vector[0])
+            dense_futures = self._submit("search_vectors", vector, candidates)
+            lexical = merge_results([future.result() for future in lexical_futures.values()], candidates)
+            dense = merge_results([future.result()[0] for future in dense_futures.values()], candidates)
+
+            fused = {}
+            chunks = {}
+            for ranking in (lexical, dense):
+                for rank, result in enumerate(ranking):
+                    key = (result['document'], result['chunk_index'])
+                    fused[key] = fused.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                    chunks[key] = result  # The dense result, when there is one
+            best = sorted(fused, key=lambda key: (-fused[key], key))[:top_k]
+            results = []
+            for i, key in enumerate(best):
+                result = dict(chunks[key], rank=i + 1, fused_score=fused[key])
+                if 'dense_score' in result:
+                    result['score'] = result.pop('dense_score')
+                results.append(result)
+            self._search_results.put(cache_key, results)
+
+        return [dict(result) for result in results]
+
+    def search_by_document(self, document_name: str, query: str, top_k: int = 3) -> List[Dict]:
+        """
+        Search within a specific document, on the shard that holds it
+        """
+        reader = self._readers.get(shard_of(document_name, self.shard_count))
+        if reader is None:
+            return []
+        return reader.search_document_vector(document_name, self.shards[0].embed_query(query)[0], top_k)
+
+    def lookup_section(self, citation: str) -> Optional[Dict]:
+        """
+        Resolve a citation on every shard; a section found on several shards goes to the best-named document
+        """
+        found = [section for section in self._fan_out("lookup_section", citation).values() if section]
+        if len(found) <= 1:
+            return found[0] if found else None
+
+        # As in SectionIndex.resolve: the document name sharing most words with the citation
+        words = set(tokenize_bengali(citation))
+        overlap = [len(words & set(tokenize_bengali(section['document']))) for section in found]
+        best = max(range(len(found)), key=lambda i: overlap[i])
+        if not overlap[best] or overlap.count(overlap[best]) > 1:
+            return None
+        return found[best]
+
+    def get_document_info(self) -> Dict[str, int]:
+        """
+        Chunk counts per document across all shards
+        """
+        doc_counts = {}
+        for counts in self._fan_out("get_document_info").values():
+            for name, count in counts.items():
+                doc_counts[name] = doc_counts.get(name, 0) + count
+        return doc_counts
+
+    def get_context_for_query(self, query: str, top_k: int = 5, packer: Optional[ContextPacker] = None) -> str:
+        """
+        Get formatted context string for RAG, packed by packer if given
+        """
+        results = self.search(query, top_k)
+        return self.format_context(packer.pack(results) if packer is not None else results)
+
+    def format_context(self, results: List[Dict]) -> str:
+        return self.shards[0].format_context(results)
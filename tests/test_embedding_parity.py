@@ -0,0 +1,44 @@
+"""
+Parity of the ONNX Runtime embedding backends with the PyTorch (sentence-transformers) embeddings
+
+Skipped when onnxruntime, sentence-transformers or the model itself is not available.
+The first run exports the model to Config.ONNX_MODEL_PATH.
+"""
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("transformers")
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+from config import Config
+from embedding_backends import check_parity, get_embedding_backend
+
+TEXTS = [
+    "বাংলাদেশের সংবিধানের ২৭ অনুচ্ছেদ অনুযায়ী আইনের দৃষ্টিতে সকল নাগরিক সমান।",
+    "দণ্ডবিধির ৪২০ ধারায় প্রতারণার শাস্তির বিধান রয়েছে।",
+    "তালাকের নোটিশ চেয়ারম্যানের কাছে পাঠাতে হয়।",
+    "খোরপোশ কত দিন পাওয়া যায়?",
+    "পারিবারিক আদালতে মামলা করার নিয়ম কী?",
+    "Section 7 of the Muslim Family Laws Ordinance, 1961",
+    "ধারা",
+]
+
+@pytest.fixture(scope="module")
+def reference():
+    try:
+        return get_embedding_backend("sentence-transformers", Config.EMBEDDING_MODEL)
+    except Exception as e:  # No cached model and no network
+        pytest.skip(f"Embedding model not available: {e}")
+
+@pytest.mark.parametrize("backend_name", ["onnx", "onnx-int8"])
+def test_onnx_backend_matches_pytorch(reference, backend_name):
+    try:
+        backend = get_embedding_backend(backend_name, Config.EMBEDDING_MODEL, Config.ONNX_MODEL_PATH)
+    except Exception as e:
+        pytest.skip(f"{backend_name} backend not available: {e}")
+
+    result = check_parity(backend, reference, TEXTS, Config.EMBEDDING_PARITY_THRESHOLD)
+    assert result['passed'], (f"{backend_name}: min cosine {result['min_cosine']:.4f} "
+                              f"< {Config.EMBEDDING_PARITY_THRESHOLD}")
@@ -1,10 +1,26 @@
 import os
+import copy
 import json
 import pickle
+import shutil
+import hashlib
+import threading
 import numpy as np
 import faiss
-from typing import List, Dict, Tuple, Optional
-from sentence_transformers import SentenceTransformer
+from typing import List, Dict, Tuple, Optional, Iterable, Union
+from embedding_backends import ParallelEncoder, embedding_id, get_embedding_backend
+from dedup import NearDuplicateIndex
+from embedding_cache import EmbeddingCache, text_key
+from query_cache import QueryCache, normalize_query
+from bm25_index import (BM25Index, tokenize_bengali, BM25_OFFSETS_FILE, BM25_ROWS_FILE, BM25_TF_FILE,
+                        BM25_LENGTHS_FILE, BM25_VOCAB_FILE)
+from section_index import SectionIndex, SECTIONS_FILE, assemble_text
+from document_router import DocumentRouter, RoutingUnit
+from context_packer import ContextPacker
+from chunk_store import (MappedChunks, MappedMetadata, chunk_store_exists, write_chunk_store,
+                         CHUNK_BLOB_FILE, CHUNK_OFFSETS_FILE, METADATA_TABLE_FILE, METADATA_EXTRA_FILE)
+from index_snapshots import (SNAPSHOTS_DIR, fallback_snapshots, publish_snapshot, read_current_snapshot,
+                             resolve_snapshot, verify_snapshot)
 import logging
 from pathlib import Path
 
@@ -12,84 +28,634 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# File names inside a snapshot directory, next to the chunk store, BM25 and section files
+INDEX_FILE = "faiss_index.bin"
+MANIFEST_FILE = "manifest.json"
+
+# Files saved directly in the database directory before snapshots existed
+_LEGACY_FILES = (INDEX_FILE, MANIFEST_FILE, "metadata.json", "chunks.pkl", CHUNK_BLOB_FILE, CHUNK_OFFSETS_FILE,
+                 METADATA_TABLE_FILE, METADATA_EXTRA_FILE, BM25_OFFSETS_FILE, BM25_ROWS_FILE, BM25_TF_FILE,
+                 BM25_LENGTHS_FILE, BM25_VOCAB_FILE, SECTIONS_FILE)
+
+# Either {document_name: chunks} or a lazy iterable of (document_name, chunks) pairs.
+# A chunk is its text, or a dict with a 'text' key plus extra metadata fields.
+Chunk = Union[str, Dict]
+DocumentChunks = Union[Dict[str, List[Chunk]], Iterable[Tuple[str, List[Chunk]]]]
+
+def create_faiss_index(index_factory: str, dimension: int) -> faiss.Index:
+    """
+    Create an empty inner-product index from a FAISS factory string
+    
+    "Flat" is exact brute force; e.g. "IVF1024,Flat", "IVF1024,PQ48" or "HNSW32"
+    trade some recall for much faster search on large corpora.
+    """
+    if index_factory == "Flat":
+        return faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+    return faiss.index_factory(dimension, index_factory, faiss.METRIC_INNER_PRODUCT)
+
+# Vector encodings for storage modes, as FAISS factory components
+STORAGE_MODES = {"float32": None, "float16": "SQfp16", "sq8": "SQ8"}
+
+# Seed of the random training sample, so rebuilding the same corpus gives the same index
+TRAIN_SAMPLE_SEED = 0
+
+def compose_index_factory(index_factory: str, storage: str = "float32", pca_dim: int = 0) -> str:
+    """
+    Factory string for an index type with a storage mode and optional PCA reduction
+    
+    float16 halves and sq8 (8-bit scalar quantization) quarters the memory of
+    the stored vectors; pca_dim projects vectors (and queries) to fewer dimensions
+    first. E.g. ("Flat", "sq8", 128) -> "PCA128,SQ8", ("HNSW32", "float16") -> "HNSW32,SQfp16".
+    """
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode '{storage}'. Available: {', '.join(STORAGE_MODES)}")
+    
+    parts = index_factory.split(",")
+    encoding = STORAGE_MODES[storage]
+    if encoding:
+        if parts[-1] == "Flat":
+            parts[-1] = encoding
+        elif parts[-1].startswith("HNSW"):
+            parts.append(encoding)
+        else:
+            logger.warning(f"Index type {index_factory} already sets its own encoding; ignoring storage '{storage}'")
+    if pca_dim:
+        parts.insert(0, f"PCA{pca_dim}")
+    return ",".join(parts)
+
+def apply_search_parameters(index: faiss.Index, nprobe: int, ef_search: int) -> None:
+    """
+    Set the IVF nprobe / HNSW efSearch search-time knobs where the index has them
+    """
+    inner = index
+    while isinstance(inner, faiss.IndexPreTransform):
+        inner = faiss.downcast_index(inner.index)
+    
+    parameters = faiss.ParameterSpace()
+    if faiss.try_extract_index_ivf(inner) is not None:
+        parameters.set_index_parameter(index, "nprobe", nprobe)
+    if isinstance(inner, faiss.IndexHNSW):
+        parameters.set_index_parameter(index, "efSearch", ef_search)
+
+def enable_row_lookup(index: faiss.Index) -> None:
+    """
+    Give an IVF index the in-memory direct map it needs to reconstruct rows by id
+    
+    The map is not saved with the index (see write_index_file), so it is added
+    again whenever an index is loaded, trained or rebuilt. Later adds keep it up to date.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+
+def write_index_file(index: faiss.Index, path: str) -> None:
+    """
+    Write a FAISS index without the direct map enable_row_lookup added
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None or ivf.direct_map.type == faiss.DirectMap.NoMap:
+        faiss.write_index(index, path)
+        return
+    
+    ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    try:
+        faiss.write_index(index, path)
+    finally:
+        ivf.make_direct_map()
+
+class _LazyEmbeddingModel:
+    """
+    Embedding backend loaded on first use; shared by the databases of successive snapshots
+    """
+    
+    def __init__(self, backend: str, model_name: str, onnx_path: str, threads: int):
+        self.backend = backend
+        self.model_name = model_name
+        self.onnx_path = onnx_path
+        self.threads = threads
+        self.model = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    logger.info(f"Loading embedding model: {self.model_name} ({self.backend})")
+                    self.model = get_embedding_backend(self.backend, self.model_name,
+                                                       onnx_path=self.onnx_path, threads=self.threads)
+        return self.model
+
 class LegalVectorDatabase:
     """
     FAISS-based vector database for Bengali legal documents
     """
     
     def __init__(self, embedding_model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", 
-                 db_path: str = "./vector_db"):
+                 db_path: str = "./vector_db", index_factory: str = "Flat", train_size: int = 50000,
+                 nprobe: int = 16, ef_search: int = 64, embedding_cache_path: Optional[str] = None,
+                 query_cache_size: int = 1024, query_cache_ttl: float = 3600,
+                 retrieval_mode: str = "dense", rrf_k: int = 60, hybrid_candidates: int = 50,
+                 storage: str = "float32", pca_dim: int = 0, embedding_backend: str = "sentence-transformers",
+                 onnx_path: str = "./onnx_models", embedding_threads: int = 0, embedding_workers: int = 1,
+                 embedding_batch_size: int = 32, keep_snapshots: int = 3, verify_snapshots: bool = True,
+                 route_documents: int = 0):
         self.embedding_model_name = embedding_model_name
         self.db_path = Path(db_path)
         self.db_path.mkdir(exist_ok=True)
         
-        # Initialize the embedding model
-        logger.info(f"Loading embedding model: {embedding_model_name}")
-        self.embedding_model = SentenceTransformer(embedding_model_name)
+        # Index type (with storage mode and PCA reduction) and its training / search parameters
+        self.index_factory = compose_index_factory(index_factory, storage, pca_dim)
+        self.train_size = train_size
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self._reset_training_sample()
+        
+        # The embedding model is loaded on first use (or by warm_up()), so loading a
+        # saved index and answering lexical lookups never wait for it
+        self.embedding_backend = embedding_backend
+        self.onnx_path = onnx_path
+        self.embedding_threads = embedding_threads
+        self.embedding_id = embedding_id(embedding_backend, embedding_model_name)
+        self._embedding_model = _LazyEmbeddingModel(embedding_backend, embedding_model_name,
+                                                    onnx_path, embedding_threads)
+        
+        # With more than one worker, index builds embed chunks in a pool of processes
+        self.embedding_workers = embedding_workers
+        self.embedding_batch_size = embedding_batch_size
+        self._parallel_encoder = None
+        
+        # Chunk embeddings kept across builds, keyed by model (and backend) and chunk text
+        self.embedding_cache = (EmbeddingCache(embedding_cache_path, self.embedding_id)
+                                if embedding_cache_path else None)
+        
+        # "dense" (embeddings only) or "hybrid" (BM25 and embeddings fused by reciprocal rank)
+        if retrieval_mode not in ("dense", "hybrid"):
+            raise ValueError(f"Unknown retrieval mode '{retrieval_mode}'. Available: dense, hybrid")
+        self.retrieval_mode = retrieval_mode
+        self.rrf_k = rrf_k
+        self.hybrid_candidates = hybrid_candidates
+        self._bm25 = None  # Lexical index over self.chunks
+        self._bm25_version = -1
+        
+        # Two-stage dense search: with route_documents > 0 only the chunks of that many
+        # documents, chosen by their routing vectors (see document_router.py), are scored
+        self.route_documents = route_documents
+        self._router = None
+        self._router_version = -1
+        
+        # Query embeddings and search results per normalized question; results are
+        # dropped whenever index_version changes
+        self._query_embeddings = QueryCache(query_cache_size, query_cache_ttl)
+        self._search_results = QueryCache(query_cache_size, query_cache_ttl)
+        self._search_results_version = 0
         
         # FAISS index
         self.index = None
+        self.index_version = 0  # Bumped on every change to the indexed contents
+        self._rows_by_document = {}  # Document name -> index rows, for filtered search
+        self._document_rows_version = -1
+        self._index_mapped = False  # True while the index vectors are memory-mapped read-only
         self.document_metadata = []  # Store document info for each embedding
         self.chunks = []  # Store original text chunks
+        self.sections = SectionIndex()  # Statute sections / articles per document
+        
+        # Every save publishes an immutable snapshot directory (see index_snapshots.py);
+        # the index files below live in the loaded or last saved one
+        self.keep_snapshots = keep_snapshots
+        self.verify_snapshots = verify_snapshots
+        self.snapshot = None  # Name of that snapshot; None for a legacy or unsaved index
+        self._set_data_path(self.db_path)
+        self.checkpoint_dir = self.db_path / "build_checkpoint"
+        self.pending_vectors_file = self.db_path / "untrained_vectors.f32"  # Vectors waiting for training
+    
+    def _set_data_path(self, data_path: Path) -> None:
+        """
+        Point the index file paths at a snapshot directory (or the legacy flat layout)
+        """
+        self.data_path = data_path
+        self.index_file = data_path / INDEX_FILE
+        self.metadata_file = data_path / "metadata.json"
+        self.chunks_file = data_path / "chunks.pkl"
+        self.manifest_file = data_path / MANIFEST_FILE
+    
+    @property
+    def embedding_model(self):
+        """
+        The embedding backend, loaded on first access
+        """
+        return self._embedding_model.get()
+    
+    @property
+    def embedding_model_loaded(self) -> bool:
+        return self._embedding_model.model is not None
+    
+    def warm_up(self) -> threading.Thread:
+        """
+        Load the embedding model in a background thread
         
-        # File paths for persistence
-        self.index_file = self.db_path / "faiss_index.bin"
-        self.metadata_file = self.db_path / "metadata.json"
-        self.chunks_file = self.db_path / "chunks.pkl"
+        The first query then finds the model ready instead of paying for loading
+        it; a query arriving earlier simply waits for the load in progress.
+        """
+        def load():
+            try:
+                self.embedding_model.encode(["উষ্ণকরণ"])
+            except Exception as e:
+                logger.error(f"Error warming up the embedding model: {str(e)}")
         
-    def create_embeddings(self, texts: List[str]) -> np.ndarray:
+        thread = threading.Thread(target=load, name="embedding-warm-up", daemon=True)
+        thread.start()
+        return thread
+    
+    def get_tokenizer(self):
+        """
+        Get the embedding model's tokenizer
+        """
+        return self.embedding_model.tokenizer
+    
+    def max_chunk_tokens(self) -> int:
+        """
+        Largest chunk, in tokenizer tokens, that the embedding model encodes without truncation
+        """
+        # Leave room for the special tokens the model adds around every text
+        special_tokens = self.embedding_model.tokenizer.num_special_tokens_to_add(pair=False)
+        return self.embedding_model.max_seq_length - special_tokens
+    
+    def create_embeddings(self, texts: List[str], parallel: bool = False) -> np.ndarray:
         """
         Create embeddings for a list of texts
+        
+        parallel=True lets an index build spread large batches over the embedding
+        worker processes; the build closes them with close_embedding_workers().
+        Queries are always embedded in-process.
         """
         logger.info(f"Creating embeddings for {len(texts)} texts")
-        embeddings = self.embedding_model.encode(texts, show_progress_bar=True)
+        if parallel and self.embedding_workers > 1 and len(texts) > self.embedding_batch_size:
+            if self._parallel_encoder is None:
+                self._parallel_encoder = ParallelEncoder(self.embedding_backend, self.embedding_model_name,
+                                                         self.embedding_workers, onnx_path=self.onnx_path,
+                                                         threads_per_worker=self.embedding_threads)
+            # Bucket by token length when the model is loaded anyway (token-based chunking)
+            tokenizer = self.embedding_model.tokenizer if self.embedding_model_loaded else None
+            return self._parallel_encoder.encode(texts, self.embedding_batch_size, tokenizer)
+        
+        embeddings = self.embedding_model.encode(texts, batch_size=self.embedding_batch_size,
+                                                 show_progress_bar=True)
         return embeddings.astype('float32')
     
-    def build_index(self, document_chunks: Dict[str, List[str]]) -> None:
+    def close_embedding_workers(self) -> None:
+        """
+        Stop the embedding worker processes, if a build started them
+        """
+        if self._parallel_encoder is not None:
+            self._parallel_encoder.close()
+            self._parallel_encoder = None
+    
+    def embed_chunks(self, texts: List[str], parallel: bool = False) -> np.ndarray:
+        """
+        Create embeddings for chunk texts, encoding only those missing from the embedding cache
+        """
+        if self.embedding_cache is None:
+            return self.create_embeddings(texts, parallel)
+        
+        keys = [text_key(text) for text in texts]
+        cached, misses = self.embedding_cache.lookup(keys)
+        if not misses:
+            return np.vstack([cached[i] for i in range(len(texts))])
+        
+        # Encode each distinct missing text once
+        miss_keys = {}
+        for i in misses:
+            miss_keys.setdefault(keys[i], i)
+        new_embeddings = self.create_embeddings([texts[i] for i in miss_keys.values()], parallel)
+        self.embedding_cache.add(list(miss_keys), new_embeddings)
+        
+        by_key = dict(zip(miss_keys, new_embeddings))
+        logger.info(f"Embedding cache: {len(cached)} hits, {len(misses)} misses")
+        return np.vstack([cached[i] if i in cached else by_key[keys[i]] for i in range(len(texts))])
+    
+    def build_index(self, document_chunks: DocumentChunks, batch_size: int = 256,
+                    checkpoint: bool = False, deduplicator: Optional[NearDuplicateIndex] = None) -> None:
         """
         Build FAISS index from document chunks
+        
+        document_chunks may be a dict or a lazy iterable of (document_name, chunks) pairs.
         """
         logger.info("Building FAISS index...")
         
-        # Prepare all chunks and metadata
-        all_chunks = []
-        all_metadata = []
-        
-        for doc_name, chunks in document_chunks.items():
-            for chunk_idx, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
-                all_metadata.append({
-                    'document': doc_name,
-                    'chunk_index': chunk_idx,
-                    'total_chunks': len(chunks)
-                })
+        self.clear_index()
+        document_count = self.add_documents(document_chunks, batch_size, checkpoint, deduplicator)
         
-        if not all_chunks:
+        if self.index is None:
             logger.error("No chunks provided for indexing")
             return
         
-        # Create embeddings
-        embeddings = self.create_embeddings(all_chunks)
+        logger.info(f"Index built with {len(self.chunks)} chunks from {document_count} documents")
+    
+    def clear_index(self) -> None:
+        """
+        Drop every indexed chunk, ready for a new build
+        """
+        self.index = None
+        self._index_mapped = False
+        self._reset_training_sample()
+        self.document_metadata = []
+        self.chunks = []
+        self.sections.clear()  # In place: the document iterator may already be filling it
+        self.index_version += 1
+    
+    def add_documents(self, document_chunks: DocumentChunks, batch_size: int = 256,
+                      checkpoint: bool = False, deduplicator: Optional[NearDuplicateIndex] = None) -> int:
+        """
+        Embed the chunks of new documents and append them to the index
+        
+        Chunks are embedded and added in fixed-size batches while document_chunks is
+        consumed, so memory stays bounded by one document plus one batch. With
+        checkpoint=True every finished batch is also written to the checkpoint
+        directory, and an interrupted build re-run over the same input reuses those
+        batches instead of embedding them again.
         
-        # Initialize FAISS index
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+        With a deduplicator, a chunk that nearly duplicates an indexed chunk (or one
+        added earlier in this call) is not embedded; its metadata is appended to the
+        canonical chunk's 'duplicates' list instead, with its own 'text' when the
+        wording differs. Returns the number of documents added.
+        """
+        if isinstance(document_chunks, dict):
+            document_chunks = document_chunks.items()
+        
+        self._ensure_writable()
         
-        # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(embeddings)
+        if deduplicator is not None and not len(deduplicator):
+            for row, text in enumerate(self.chunks):
+                deduplicator.find_or_insert(row, text)
         
-        # Add embeddings to index
-        self.index.add(embeddings)
+        document_count = 0
+        chunk_count = 0
+        duplicate_count = 0
+        batch_chunks = []
+        batch_metadata = []
+        batch_number = 0
+        
+        def flush() -> None:
+            nonlocal batch_number
+            self._add_batch(batch_chunks, batch_metadata, batch_number if checkpoint else None)
+            batch_number += 1
+            batch_chunks.clear()
+            batch_metadata.clear()
+        
+        try:
+            for doc_name, chunks in document_chunks:
+                document_count += 1
+                for chunk_idx, chunk in enumerate(chunks):
+                    metadata = {
+                        'document': doc_name,
+                        'chunk_index': chunk_idx,
+                        'total_chunks': len(chunks)
+                    }
+                    if isinstance(chunk, dict):
+                        # Chunk records carry extra metadata such as page provenance
+                        metadata.update((key, value) for key, value in chunk.items() if key != 'text')
+                        chunk = chunk['text']
+                
+                    if deduplicator is not None:
+                        row = len(self.chunks) + len(batch_chunks)
+                        canonical = deduplicator.find_or_insert(row, chunk)
+                        if canonical is not None:
+                            # The canonical chunk is either indexed already or still in the pending batch
+                            canonical_metadata = (self.document_metadata[canonical] if canonical < len(self.chunks)
+                                                  else batch_metadata[canonical - len(self.chunks)])
+                            canonical_text = (self.chunks[canonical] if canonical < len(self.chunks)
+                                              else batch_chunks[canonical - len(self.chunks)])
+                            if chunk != canonical_text:
+                                # Near-duplicates of statutes can differ in a number that matters
+                                metadata['text'] = chunk
+                            canonical_metadata.setdefault('duplicates', []).append(metadata)
+                            duplicate_count += 1
+                            continue
+                
+                    batch_chunks.append(chunk)
+                    batch_metadata.append(metadata)
+                    chunk_count += 1
+                    if len(batch_chunks) >= batch_size:
+                        flush()
+        
+            if batch_chunks:
+                flush()
+        finally:
+            self.close_embedding_workers()
+        
+        # Train on the sample of everything this build embedded
+        self._train_index()
+        self.index_version += 1
+        
+        if chunk_count or duplicate_count:
+            logger.info(f"Added {chunk_count} chunks from {document_count} documents"
+                        + (f", merged {duplicate_count} near-duplicates" if duplicate_count else ""))
+        return document_count
+    
+    def _add_batch(self, texts: List[str], metadata: List[Dict], checkpoint_number: Optional[int]) -> None:
+        """
+        Embed one batch of chunks (or reuse its checkpoint) and add it to the index
+        """
+        embeddings = None
+        if checkpoint_number is not None:
+            batch_hash = hashlib.sha256("\x00".join(texts).encode('utf-8')).hexdigest()[:16]
+            batch_file = self.checkpoint_dir / f"batch_{checkpoint_number:06d}_{batch_hash}.npy"
+            if batch_file.exists():
+                embeddings = np.load(batch_file)
+                logger.info(f"Resumed batch {checkpoint_number} from checkpoint")
+        
+        if embeddings is None:
+            # Create embeddings and normalize them for cosine similarity
+            # Only called from add_documents, which closes the worker pool when it ends
+            embeddings = self.embed_chunks(texts, parallel=True)
+            faiss.normalize_L2(embeddings)
+            
+            if checkpoint_number is not None:
+                self.checkpoint_dir.mkdir(exist_ok=True)
+                # Drop any stale checkpoint for this batch position before writing the new one
+                for stale in self.checkpoint_dir.glob(f"batch_{checkpoint_number:06d}_*.npy"):
+                    stale.unlink()
+                tmp_file = batch_file.with_suffix('.tmp')
+                with open(tmp_file, 'wb') as f:
+                    np.save(f, embeddings)
+                os.replace(tmp_file, batch_file)
+        
+        self._add_vectors(embeddings)
         
         # Store metadata and chunks
-        self.document_metadata = all_metadata
-        self.chunks = all_chunks
+        self.document_metadata.extend(metadata)
+        self.chunks.extend(texts)
+    
+    def _add_vectors(self, embeddings: np.ndarray) -> None:
+        """
+        Add normalized vectors to the index, training it first if its type needs training
+        
+        Until the build ends an untrained index only keeps a fixed-size random
+        sample of the vectors in memory for training; all of them are appended to
+        pending_vectors_file and added once the index is trained (see _train_index).
+        """
+        # Initialize FAISS index
+        if self.index is None:
+            self.index = create_faiss_index(self.index_factory, embeddings.shape[1])
+        
+        if self.index.is_trained:
+            self.index.add(embeddings)
+            return
+        
+        with open(self.pending_vectors_file, 'ab' if self._train_seen else 'wb') as f:
+            f.write(np.ascontiguousarray(embeddings, dtype='<f4').tobytes())
+        self._sample_for_training(embeddings)
+    
+    def _reset_training_sample(self) -> None:
+        self._train_sample: Optional[np.ndarray] = None
+        self._train_seen = 0  # Vectors offered to the sample so far
+        self._train_rng = np.random.default_rng(TRAIN_SAMPLE_SEED)
+    
+    def _sample_for_training(self, embeddings: np.ndarray) -> None:
+        """
+        Keep a uniform random sample of at most train_size of all vectors seen (reservoir sampling)
+        
+        Documents are embedded one after another, so the first vectors alone would
+        only cover the first few acts.
+        """
+        if self._train_sample is None:
+            self._train_sample = np.empty((self.train_size, embeddings.shape[1]), dtype='float32')
         
-        logger.info(f"Index built with {len(all_chunks)} chunks from {len(document_chunks)} documents")
+        positions = np.arange(self._train_seen, self._train_seen + len(embeddings))
+        filling = positions < self.train_size
+        self._train_sample[positions[filling]] = embeddings[filling]
+        if not filling.all():
+            # Vector number i replaces a random sample slot with probability train_size / (i + 1)
+            slots = self._train_rng.integers(0, positions[~filling] + 1)
+            kept = slots < self.train_size
+            self._train_sample[slots[kept]] = embeddings[~filling][kept]
+        self._train_seen += len(embeddings)
+    
+    def _train_index(self, block_size: int = 65536) -> None:
+        """
+        Train the index on the random sample, then add the pending vectors block by block
+        
+        Falls back to an exact flat index when there are too few vectors to train on.
+        """
+        if not self._train_seen:
+            return
         
-    def save_index(self) -> None:
+        sample = self._train_sample[:min(self._train_seen, self.train_size)]
+        logger.info(f"Training {self.index_factory} index on {len(sample)} of {self._train_seen} vectors...")
+        try:
+            self.index.train(sample)
+        except RuntimeError as e:
+            logger.warning(f"Could not train {self.index_factory} index ({e}); using an exact flat index")
+            self.index = faiss.IndexFlatIP(sample.shape[1])
+        self._reset_training_sample()
+        
+        enable_row_lookup(self.index)
+        pending = np.memmap(self.pending_vectors_file, dtype='<f4', mode='r').reshape(-1, self.index.d)
+        for start in range(0, len(pending), block_size):
+            self.index.add(np.ascontiguousarray(pending[start:start + block_size]))
+        del pending
+        self.pending_vectors_file.unlink()
+        apply_search_parameters(self.index, self.nprobe, self.ef_search)
+    
+    def clear_checkpoint(self) -> None:
+        """
+        Delete the batch checkpoints of a finished build
         """
-        Save the FAISS index and metadata to disk
+        if self.checkpoint_dir.exists():
+            shutil.rmtree(self.checkpoint_dir)
+    
+    def remove_documents(self, document_names: List[str]) -> int:
+        """
+        Remove all chunks of the given documents from the index
+        
+        A removed chunk that also stands for near-duplicates in kept documents stays
+        in the index and is reassigned to the first of those duplicates.
+        """
+        names = set(document_names)
+        remove_ids = []
+        self._ensure_writable()
+        # Section tables and duplicate lists feed results too, so any change to them needs a new index_version
+        changed = any(name in self.sections.documents for name in names)
+        self.sections.remove_documents(document_names)
+        
+        for i, metadata in enumerate(self.document_metadata):
+            duplicates = [dup for dup in metadata.get('duplicates', []) if dup['document'] not in names]
+            if metadata['document'] in names:
+                if not duplicates:
+                    remove_ids.append(i)
+                    continue
+                # Promote a surviving duplicate, with its own wording, to be the canonical location
+                promoted = duplicates.pop(0)
+                old_text = self.chunks[i]
+                self.chunks[i] = promoted.pop('text', old_text)
+                for dup in duplicates:
+                    if dup.setdefault('text', old_text) == self.chunks[i]:
+                        del dup['text']
+                metadata.update(promoted)
+                changed = True
+            if 'duplicates' in metadata:
+                changed = changed or len(duplicates) != len(metadata['duplicates'])
+                metadata['duplicates'] = duplicates
+        
+        if not remove_ids or self.index is None:
+            if changed:
+                self.index_version += 1
+            return 0
+        
+        self._remove_rows(np.array(remove_ids, dtype='int64'))
+        
+        removed = set(remove_ids)
+        self.document_metadata = [m for i, m in enumerate(self.document_metadata) if i not in removed]
+        self.chunks = [c for i, c in enumerate(self.chunks) if i not in removed]
+        self.index_version += 1
+        
+        logger.info(f"Removed {len(remove_ids)} chunks from {len(names)} documents")
+        return len(remove_ids)
+    
+    def _remove_rows(self, rows: np.ndarray) -> None:
+        """
+        Remove index rows so the remaining rows keep lining up with self.chunks
+        """
+        if isinstance(self.index, faiss.IndexFlat):
+            # Flat indexes compact on removal
+            self.index.remove_ids(rows)
+            return
+        
+        # Other index types keep sparse ids (IVF) or cannot remove at all (HNSW), so
+        # re-add the kept vectors to an emptied copy that keeps the trained structure
+        keep = np.setdiff1d(np.arange(self.index.ntotal, dtype='int64'), rows)
+        vectors = self._row_vectors(keep) if len(keep) else None
+        
+        rebuilt = faiss.clone_index(self.index)
+        rebuilt.reset()
+        enable_row_lookup(rebuilt)
+        if vectors is not None:
+            rebuilt.add(vectors)
+        apply_search_parameters(rebuilt, self.nprobe, self.ef_search)
+        self.index = rebuilt
+    
+    def load_manifest(self) -> Optional[Dict]:
+        """
+        Load the build manifest (document hashes and build parameters), if any
+        """
+        if not self.manifest_file.exists():
+            return None
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Error loading manifest: {e}")
+            return None
+    
+    def save_index(self, manifest: Optional[Dict] = None) -> None:
+        """
+        Save the FAISS index and metadata to disk as a new snapshot
+        
+        The index, chunk store (see chunk_store.py), BM25 postings, section table
+        and the build manifest are written to a fresh snapshot directory which
+        then becomes current in one atomic step, so a crash or a concurrent reader
+        never sees files from different saves. Files of the legacy flat layout are
+        removed once the first snapshot is published.
         """
         if self.index is None:
             logger.error("No index to save")
@@ -97,48 +663,231 @@ class LegalVectorDatabase:
             
         logger.info("Saving FAISS index and metadata...")
         
-        # Save FAISS index
-        faiss.write_index(self.index, str(self.index_file))
+        def write(path: Path) -> None:
+            write_index_file(self.index, str(path / INDEX_FILE))
+            write_chunk_store(path, self.chunks, self.document_metadata)
+            self.lexical_index().save(path)
+            if self.route_documents > 0:
+                self.document_router().save(path)
+            self.sections.save(path)
+            if manifest is not None:
+                with open(path / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
         
-        # Save metadata
-        with open(self.metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(self.document_metadata, f, ensure_ascii=False, indent=2)
+        self.snapshot = publish_snapshot(self.db_path, write, keep=self.keep_snapshots, protect=[self.snapshot])
+        self._set_data_path(self.db_path / SNAPSHOTS_DIR / self.snapshot)
         
-        # Save chunks
-        with open(self.chunks_file, 'wb') as f:
-            pickle.dump(self.chunks, f)
+        for legacy_file in _LEGACY_FILES:
+            if (self.db_path / legacy_file).exists():
+                (self.db_path / legacy_file).unlink()
             
-        logger.info(f"Index saved to {self.db_path}")
+        logger.info(f"Index saved to {self.data_path}")
     
-    def load_index(self) -> bool:
+    def load_index(self, use_mmap: bool = True, snapshot: Optional[str] = None) -> bool:
         """
         Load the FAISS index and metadata from disk
+        
+        With use_mmap the index vectors, chunk texts and metadata table are memory
+        mapped rather than read into the heap: loading is near-instant and processes
+        on one host share a single copy through the page cache. The mapped data is
+        read-only; it is copied into memory the first time the index is modified.
+        
+        Loads the current snapshot once its manifest and file sizes check out (the
+        SHA-256 checksums were taken when it was published). If it is incomplete or
+        fails to load, the newest older snapshot that passes full checksum
+        verification (with verify_snapshots) is loaded instead. Databases saved
+        before snapshots existed load from db_path. A named snapshot is only
+        loaded if it is complete.
+        """
+        if snapshot is not None:
+            snapshot_path = self.db_path / SNAPSHOTS_DIR / snapshot
+            return verify_snapshot(snapshot_path, checksums=False) and self._load_files(snapshot_path, use_mmap)
+        
+        snapshot_path = resolve_snapshot(self.db_path, checksums=False)
+        if self._load_files(snapshot_path, use_mmap):
+            return True
+        if snapshot_path is None:
+            return False
+        
+        for fallback_path in fallback_snapshots(self.db_path, snapshot_path.name, self.verify_snapshots):
+            logger.warning(f"Snapshot {snapshot_path.name} did not load, falling back to {fallback_path.name}")
+            if self._load_files(fallback_path, use_mmap):
+                return True
+        return False
+    
+    def _load_files(self, snapshot_path: Optional[Path], use_mmap: bool) -> bool:
+        """
+        Load the index files of a snapshot directory, or of db_path for the legacy layout
         """
         try:
-            if not all([self.index_file.exists(), self.metadata_file.exists(), self.chunks_file.exists()]):
+            if snapshot_path is not None:
+                self.snapshot = snapshot_path.name
+                self._set_data_path(snapshot_path)
+            else:
+                self.snapshot = None
+                self._set_data_path(self.db_path)
+            
+            if not self.index_file.exists():
                 logger.warning("Index files not found")
                 return False
             
             logger.info("Loading FAISS index and metadata...")
             
-            # Load FAISS index
-            self.index = faiss.read_index(str(self.index_file))
+            if chunk_store_exists(self.data_path):
+                self.index = self._read_faiss_index(use_mmap)
+                if use_mmap:
+                    self.chunks = MappedChunks(self.data_path)
+                    self.document_metadata = MappedMetadata(self.data_path)
+                else:
+                    self.chunks = list(MappedChunks(self.data_path))
+                    self.document_metadata = list(MappedMetadata(self.data_path))
+                self._bm25 = BM25Index.load(self.data_path, use_mmap)
+                self._router = DocumentRouter.load(self.data_path) if self.route_documents > 0 else None
             
-            # Load metadata
-            with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                self.document_metadata = json.load(f)
+            elif self.metadata_file.exists() and self.chunks_file.exists():
+                # Index saved before the chunk store format existed
+                self.index = self._read_faiss_index(use_mmap=False)
+                
+                with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                    self.document_metadata = json.load(f)
+                
+                with open(self.chunks_file, 'rb') as f:
+                    self.chunks = pickle.load(f)
             
-            # Load chunks
-            with open(self.chunks_file, 'rb') as f:
-                self.chunks = pickle.load(f)
+            else:
+                logger.warning("Index files not found")
+                return False
             
-            logger.info(f"Loaded index with {len(self.chunks)} chunks")
+            self.sections = SectionIndex.load(self.data_path)
+            enable_row_lookup(self.index)
+            apply_search_parameters(self.index, self.nprobe, self.ef_search)
+            self.index_version += 1
+            if self._bm25 is not None and len(self._bm25) == len(self.chunks):
+                self._bm25_version = self.index_version
+            if self._router is not None and self._router.row_count == len(self.chunks):
+                self._router_version = self.index_version
+            logger.info(f"Loaded index with {len(self.chunks)} chunks"
+                        + (f" from snapshot {self.snapshot}" if self.snapshot else ""))
             return True
             
         except Exception as e:
             logger.error(f"Error loading index: {e}")
             return False
     
+    def _read_faiss_index(self, use_mmap: bool) -> faiss.Index:
+        """
+        Read the FAISS index, memory-mapping its vectors when the index type supports it
+        """
+        self._index_mapped = False
+        if use_mmap:
+            flags = faiss.IO_FLAG_MMAP | getattr(faiss, 'IO_FLAG_MMAP_IFC', 0)
+            try:
+                index = faiss.read_index(str(self.index_file), flags)
+                self._index_mapped = True
+                return index
+            except RuntimeError as e:
+                logger.info(f"Index type cannot be memory-mapped, reading it into memory: {e}")
+        return faiss.read_index(str(self.index_file))
+    
+    def _ensure_writable(self) -> None:
+        """
+        Copy memory-mapped index data into memory before it is modified
+        """
+        if isinstance(self.chunks, MappedChunks):
+            self.chunks = list(self.chunks)
+        if isinstance(self.document_metadata, MappedMetadata):
+            self.document_metadata = list(self.document_metadata)
+        if self._index_mapped:
+            # A mapped index aborts the process when resized, so read an owned copy
+            self.index = faiss.read_index(str(self.index_file))
+            self._index_mapped = False
+            enable_row_lookup(self.index)
+            apply_search_parameters(self.index, self.nprobe, self.ef_search)
+    
+    def current_snapshot(self) -> Optional[str]:
+        """
+        Name of the snapshot the last save, in this or another process, made current
+        """
+        return read_current_snapshot(self.db_path)
+    
+    def open_current_snapshot(self, use_mmap: bool = True,
+                              snapshot: Optional[str] = None) -> Optional["LegalVectorDatabase"]:
+        """
+        A new database over the current snapshot (or the named one), sharing this one's embedding model
+        
+        This database is left untouched, so searches running on it finish on the
+        data they started with; callers swap their reference once the new one has
+        loaded. Returns None if the snapshot cannot be loaded.
+        """
+        database = self.empty_copy()
+        return database if database.load_index(use_mmap, snapshot) else None
+    
+    def empty_copy(self) -> "LegalVectorDatabase":
+        """
+        A database with this one's settings and no index, sharing its embedding model
+        
+        Query embeddings are shared as well, since they do not depend on the index.
+        """
+        database = copy.copy(self)
+        database.index = None
+        database._index_mapped = False
+        database._reset_training_sample()
+        database.document_metadata = []
+        database.chunks = []
+        database.sections = SectionIndex()
+        database._bm25 = None
+        database._bm25_version = -1
+        database._router = None
+        database._router_version = -1
+        database._rows_by_document = {}
+        database._document_rows_version = -1
+        database._search_results = QueryCache(self._search_results.max_size, self._search_results.ttl)
+        database._parallel_encoder = None
+        database.snapshot = None
+        database._set_data_path(self.db_path)
+        return database
+    
+    def share_embeddings(self, other: "LegalVectorDatabase") -> None:
+        """
+        Use other's embedding model, query-embedding cache and chunk embedding cache
+        
+        Databases built in parallel threads must share one EmbeddingCache, since
+        separate instances on the same directory would append over each other.
+        """
+        self._embedding_model = other._embedding_model
+        self._query_embeddings = other._query_embeddings
+        if self.embedding_cache is not None and other.embedding_cache is not None:
+            self.embedding_cache = other.embedding_cache
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Normalized query embedding, reusing the embedding of an equivalent earlier question
+        """
+        return self.embed_queries([query])
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Normalized embeddings of several queries, encoding all uncached ones in one batch
+        """
+        cache_keys = [normalize_query(query) for query in queries]
+        embeddings = [self._query_embeddings.get(key) for key in cache_keys]
+        
+        # Encode each distinct missing question once
+        missing = {}
+        for query, key, embedding in zip(queries, cache_keys, embeddings):
+            if embedding is None:
+                missing.setdefault(key, query)
+        if missing:
+            new_embeddings = self.create_embeddings(list(missing.values()))
+            faiss.normalize_L2(new_embeddings)
+            for key, embedding in zip(missing, new_embeddings):
+                self._query_embeddings.put(key, embedding[None, :])
+            by_key = dict(zip(missing, new_embeddings))
+            embeddings = [by_key[key][None, :] if embedding is None else embedding
+                          for key, embedding in zip(cache_keys, embeddings)]
+        
+        return np.vstack(embeddings)
+    
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """
         Search for relevant chunks based on query
@@ -147,28 +896,225 @@ class LegalVectorDatabase:
             logger.error("Index not loaded")
             return []
         
-        # Create query embedding
-        query_embedding = self.create_embeddings([query])
-        faiss.normalize_L2(query_embedding)
-        
-        # Search
-        scores, indices = self.index.search(query_embedding, top_k)
-        
-        results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx >= 0:  # Valid index
-                result = {
-                    'rank': i + 1,
-                    'score': float(score),
-                    'text': self.chunks[idx],
-                    'metadata': self.document_metadata[idx],
-                    'document': self.document_metadata[idx]['document'],
-                    'chunk_index': self.document_metadata[idx]['chunk_index']
-                }
-                results.append(result)
+        return self.search_batch([query], top_k)[0]
+    
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        Search for several queries at once, in the configured retrieval mode
+        
+        Returns one result list per query, in order, in the same format as search.
+        In hybrid mode the queries that need the dense ranking are embedded in one
+        batch up front, then each query is fused on its own.
+        """
+        if self.retrieval_mode != "hybrid":
+            return self.dense_search_batch(queries, top_k)
+        
+        if self.index is not None:
+            lexical = self.lexical_index()
+            dense_queries = [query for query in queries if not lexical.is_keyword_query(tokenize_bengali(query))]
+            if dense_queries:
+                self.embed_queries(dense_queries)  # hybrid_search finds them in the query-embedding cache
+        return [self.hybrid_search(query, top_k) for query in queries]
+    
+    def dense_search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        Dense search for several queries at once
+        
+        Uncached queries are encoded in one batch and searched with one index.search
+        call over the query matrix.
+        """
+        if self.index is None:
+            logger.error("Index not loaded")
+            return [[] for _ in queries]
+        
+        if self._search_results_version != self.index_version:
+            self._search_results.clear()
+            self._search_results_version = self.index_version
+        
+        cache_keys = [(normalize_query(query), top_k) for query in queries]
+        batch_results = [self._search_results.get(key) for key in cache_keys]
         
+        missing = {}
+        for query, key, results in zip(queries, cache_keys, batch_results):
+            if results is None:
+                missing.setdefault(key, query)
+        
+        if missing:
+            found = dict(zip(missing, self.search_vectors(self.embed_queries(list(missing.values())), top_k)))
+            for key, results in found.items():
+                self._search_results.put(key, results)
+            batch_results = [found[key] if results is None else results
+                             for key, results in zip(cache_keys, batch_results)]
+        
+        # Callers get their own result dicts, so the cached lists stay intact
+        return [[dict(result) for result in results] for results in batch_results]
+    
+    def search_vectors(self, vectors: np.ndarray, top_k: int = 5) -> List[List[Dict]]:
+        """
+        Dense search with normalized query embeddings computed elsewhere, such as by a shard coordinator
+        """
+        if self.index is None:
+            return [[] for _ in vectors]
+        
+        scores, indices = self._dense_search(np.ascontiguousarray(vectors, dtype='float32'), top_k)
+        return [[self._make_result(i + 1, score, idx)
+                 for i, (score, idx) in enumerate(zip(query_scores, query_indices))
+                 if idx >= 0]  # Valid index
+                for query_scores, query_indices in zip(scores, indices)]
+    
+    def _make_result(self, rank: int, score: float, idx: int) -> Dict:
+        """
+        Search result for index row idx
+        """
+        metadata = self.document_metadata[idx]
+        return {
+            'rank': rank,
+            'score': float(score),
+            'text': self.chunks[idx],
+            'metadata': metadata,
+            'document': metadata['document'],
+            'chunk_index': metadata['chunk_index']
+        }
+    
+    def _dense_search(self, vectors: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores and rows of the top_k chunks per query, in index.search format
+        
+        With route_documents set, each query is routed to its best documents first
+        and only their chunks are scored; otherwise the whole index is searched.
+        """
+        if self.route_documents <= 0 or len(self._document_rows()) <= self.route_documents:
+            return self.index.search(vectors, top_k)
+        
+        document_rows = self._document_rows()
+        scores = np.full((len(vectors), top_k), -np.inf, dtype='float32')
+        rows = np.full((len(vectors), top_k), -1, dtype='int64')
+        for i, documents in enumerate(self.document_router().route(vectors, self.route_documents)):
+            candidates = np.unique(np.concatenate([document_rows[name] for name in documents]))
+            candidate_scores = self._row_vectors(candidates) @ vectors[i]
+            best = self._top_positions(candidates, candidate_scores, top_k)
+            scores[i, :len(best)] = candidate_scores[best]
+            rows[i, :len(best)] = candidates[best]
+        return scores, rows
+    
+    def document_router(self) -> DocumentRouter:
+        """
+        Routing vectors of the current documents and sections, rebuilt when the index has changed
+        """
+        if self._router is None or self._router_version != self.index_version:
+            logger.info(f"Building routing vectors for {len(self._document_rows())} documents...")
+            self._router = DocumentRouter.build(self._routing_units(), self._row_vectors, len(self.chunks))
+            self._router_version = self.index_version
+        return self._router
+    
+    def _routing_units(self) -> Iterable[RoutingUnit]:
+        """
+        Index rows of every document, then of each of its sections in the section table
+        """
+        for document, rows in self._document_rows().items():
+            yield document, None, rows
+            
+            sections = self.sections.documents.get(document)
+            if not sections:
+                continue
+            row_by_chunk = {}
+            for idx in rows:
+                metadata = self.document_metadata[int(idx)]
+                for location in [metadata] + metadata.get('duplicates', []):
+                    if location['document'] == document:
+                        row_by_chunk[location['chunk_index']] = int(idx)
+            for label, entry in sections.items():
+                section_rows = sorted({row_by_chunk[i] for i in entry['chunks'] if i in row_by_chunk})
+                if section_rows:
+                    yield document, label, np.array(section_rows, dtype='int64')
+    
+    def lexical_index(self) -> BM25Index:
+        """
+        BM25 index over the current chunks, rebuilt when the index has changed
+        """
+        if self._bm25 is None or self._bm25_version != self.index_version:
+            logger.info(f"Building BM25 index over {len(self.chunks)} chunks...")
+            self._bm25 = BM25Index.build(self.chunks)
+            self._bm25_version = self.index_version
+        return self._bm25
+    
+    def search_lexical(self, query: str, top_k: int = 5, vector: Optional[np.ndarray] = None) -> List[Dict]:
+        """
+        Search by BM25 keyword score alone, without the embedding model
+        
+        'score' is the BM25 score. Given the normalized query embedding, each result
+        also carries its cosine similarity to the query as 'dense_score'.
+        """
+        if self.index is None:
+            logger.error("Index not loaded")
+            return []
+        
+        rows, scores = self.lexical_index().search(tokenize_bengali(query), top_k)
+        results = [self._make_result(i + 1, score, idx) for i, (score, idx) in enumerate(zip(scores, rows))]
+        if vector is not None and results:
+            similarities = self._row_vectors(np.asarray(rows, dtype='int64')) @ np.asarray(vector).reshape(-1)
+            for result, similarity in zip(results, similarities):
+                result['dense_score'] = float(similarity)
         return results
     
+    def hybrid_search(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        Fuse BM25 and dense rankings with reciprocal rank fusion
+        
+        Each list contributes 1 / (rrf_k + rank) for its top hybrid_candidates rows.
+        Results are ordered by that fused value, reported as 'fused_score'; 'score'
+        stays the chunk's cosine similarity to the query, as in dense search.
+        Short keyword lookups that the BM25 index fully covers (e.g. "৪২০ ধারা")
+        are ranked by it alone without the embedding model; their 'score' is None
+        and 'lexical_score' holds the BM25 score.
+        """
+        if self.index is None:
+            logger.error("Index not loaded")
+            return []
+        
+        if self._search_results_version != self.index_version:
+            self._search_results.clear()
+            self._search_results_version = self.index_version
+        
+        cache_key = (normalize_query(query), top_k, "hybrid")
+        results = self._search_results.get(cache_key)
+        if results is None:
+            lexical = self.lexical_index()
+            terms = tokenize_bengali(query)
+            candidates = max(self.hybrid_candidates, top_k)
+            lexical_rows, lexical_scores = lexical.search(terms, candidates)
+            
+            if lexical.is_keyword_query(terms) and len(lexical_rows) >= top_k:
+                results = []
+                for rank, (score, idx) in enumerate(zip(lexical_scores[:top_k], lexical_rows[:top_k])):
+                    result = self._make_result(rank + 1, 0.0, idx)
+                    result.update(score=None, lexical_score=float(score), fused_score=1.0 / (self.rrf_k + rank + 1))
+                    results.append(result)
+            else:
+                vector = self.embed_query(query)
+                dense_scores, dense_rows = self._dense_search(vector, candidates)
+                fused = {}
+                for ranking in (lexical_rows, dense_rows[0][dense_rows[0] >= 0]):
+                    for rank, idx in enumerate(ranking):
+                        fused[int(idx)] = fused.get(int(idx), 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                similarities = {int(idx): float(score) for score, idx in zip(dense_scores[0], dense_rows[0]) if idx >= 0}
+                best = sorted(fused, key=lambda idx: (-fused[idx], idx))[:top_k]
+                
+                # Rows found only by BM25 get their similarity from their stored vectors
+                lexical_only = [idx for idx in best if idx not in similarities]
+                if lexical_only:
+                    scores = self._row_vectors(np.array(lexical_only, dtype='int64')) @ vector[0]
+                    similarities.update(zip(lexical_only, scores.tolist()))
+                
+                results = []
+                for i, idx in enumerate(best):
+                    result = self._make_result(i + 1, similarities[idx], idx)
+                    result['fused_score'] = fused[idx]
+                    results.append(result)
+            self._search_results.put(cache_key, results)
+        
+        return [dict(result) for result in results]
+    
     def get_document_info(self) -> Dict[str, int]:
         """
         Get information about indexed documents
@@ -177,32 +1123,179 @@ class LegalVectorDatabase:
             return {}
         
         doc_counts = {}
+        if isinstance(self.document_metadata, MappedMetadata):
+            # Count the fixed-width document column without building a dict per row
+            rows = np.bincount(self.document_metadata.document_rows(),
+                               minlength=len(self.document_metadata.documents))
+            doc_counts = {name: int(count) for name, count in zip(self.document_metadata.documents, rows) if count}
+            for i in self.document_metadata.rows_with_duplicates():
+                for dup in self.document_metadata[i]['duplicates']:
+                    doc_counts[dup['document']] = doc_counts.get(dup['document'], 0) + 1
+            return doc_counts
+        
         for metadata in self.document_metadata:
-            doc_name = metadata['document']
-            doc_counts[doc_name] = doc_counts.get(doc_name, 0) + 1
+            # Count chunks merged into another document's near-duplicate too
+            for location in [metadata] + metadata.get('duplicates', []):
+                doc_name = location['document']
+                doc_counts[doc_name] = doc_counts.get(doc_name, 0) + 1
         
         return doc_counts
     
     def search_by_document(self, document_name: str, query: str, top_k: int = 3) -> List[Dict]:
         """
         Search within a specific document
+        
+        Scores the query against every chunk of the document, including chunks merged
+        into another document's near-duplicate, so the result is the exact top_k
+        within the document at a cost proportional to its size.
         """
-        all_results = self.search(query, top_k * 3)  # Get more results to filter
+        if self.index is None:
+            logger.error("Index not loaded")
+            return []
         
-        # Filter by document
-        filtered_results = [
-            result for result in all_results 
-            if result['document'] == document_name
-        ]
+        if document_name not in self._document_rows():
+            return []
+        return self.search_document_vector(document_name, self.embed_query(query)[0], top_k)
+    
+    def search_document_vector(self, document_name: str, vector: np.ndarray, top_k: int = 3) -> List[Dict]:
+        """
+        search_by_document with a normalized query embedding computed elsewhere
+        """
+        rows = self._document_rows().get(document_name) if self.index is not None else None
+        if rows is None:
+            return []
+        
+        scores = self._row_vectors(rows) @ vector
+        best = self._top_positions(rows, scores, top_k)
+        
+        return [self._document_result(i + 1, scores[position], int(rows[position]), document_name)
+                for i, position in enumerate(best)]
+    
+    def _document_result(self, rank: int, score: float, idx: int, document_name: str) -> Dict:
+        """
+        Search result for index row idx, labelled with document_name's own chunk
+        
+        A row can stand for near-duplicate chunks of other documents; the result
+        then takes the chunk index, pages and text of the entry in 'duplicates'
+        that belongs to document_name instead of the canonical document's.
+        """
+        result = self._make_result(rank, score, idx)
+        if result['document'] != document_name:
+            for location in result['metadata'].get('duplicates', []):
+                if location['document'] == document_name:
+                    result['metadata'] = {key: value for key, value in location.items() if key != 'text'}
+                    result['text'] = location.get('text', result['text'])
+                    result['document'] = document_name
+                    result['chunk_index'] = location['chunk_index']
+                    break
+        return result
+    
+    @staticmethod
+    def _top_positions(rows: np.ndarray, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Positions of the top_k scores, best first, ties in index order like index.search
+        """
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        return best[np.lexsort((rows[best], -scores[best]))]
+    
+    def lookup_section(self, citation: str) -> Optional[Dict]:
+        """
+        Resolve a citation such as "সংবিধান অনুচ্ছেদ ২৭" from the section table, without vector search
+        
+        Returns the section's document, label, heading, text and pages plus the indexed
+        chunks that overlap it, or None if the citation does not name a known section.
+        The text is cut from those chunks by their character spans.
+        """
+        resolved = self.sections.resolve(citation)
+        if resolved is None:
+            return None
+        
+        document, label, entry = resolved
+        wanted = set(entry['chunks'])
+        chunks = []
+        rows = self._document_rows().get(document, np.empty(0, dtype='int64'))
+        for idx in rows:
+            metadata = self.document_metadata[int(idx)]
+            # The document's chunk may also sit in the 'duplicates' of another document's row
+            for location in [metadata] + metadata.get('duplicates', []):
+                if location['document'] == document and location.get('chunk_index') in wanted:
+                    chunks.append(self._document_result(len(chunks) + 1, 1.0, int(idx), document))
+                    break
         
-        return filtered_results[:top_k]
+        pieces = [(chunk['metadata']['char_start'], chunk['metadata']['char_end'], chunk['text'])
+                  for chunk in chunks if 'char_start' in chunk['metadata'] and 'char_end' in chunk['metadata']]
+        return {
+            'document': document,
+            'section': label,
+            'heading': entry.get('heading', ''),
+            'text': assemble_text(entry['char_start'], entry['char_end'], pieces),
+            'page_start': entry.get('page_start'),
+            'page_end': entry.get('page_end'),
+            'chunks': chunks
+        }
     
-    def get_context_for_query(self, query: str, top_k: int = 5) -> str:
+    def _document_rows(self) -> Dict[str, np.ndarray]:
+        """
+        Sorted index rows holding each document's chunks, rebuilt when the index changes
+        """
+        if self._document_rows_version == self.index_version:
+            return self._rows_by_document
+        
+        rows_by_document = {}
+        if isinstance(self.document_metadata, MappedMetadata):
+            # Group the fixed-width document column without building a dict per row
+            document_ids = self.document_metadata.document_rows()
+            order = np.argsort(document_ids, kind='stable')
+            bounds = np.cumsum(np.bincount(document_ids, minlength=len(self.document_metadata.documents)))
+            for doc_id, name in enumerate(self.document_metadata.documents):
+                start = bounds[doc_id - 1] if doc_id else 0
+                if bounds[doc_id] > start:
+                    rows_by_document[name] = [order[start:bounds[doc_id]]]
+            duplicate_rows = self.document_metadata.rows_with_duplicates()
+        else:
+            for i, metadata in enumerate(self.document_metadata):
+                rows_by_document.setdefault(metadata['document'], []).append([i])
+            duplicate_rows = [i for i, metadata in enumerate(self.document_metadata) if metadata.get('duplicates')]
+        
+        # A chunk merged as a near-duplicate is found through its canonical row
+        for i in duplicate_rows:
+            for dup in self.document_metadata[i]['duplicates']:
+                rows_by_document.setdefault(dup['document'], []).append([i])
+        
+        self._rows_by_document = {name: np.unique(np.concatenate(parts).astype('int64'))
+                                  for name, parts in rows_by_document.items()}
+        self._document_rows_version = self.index_version
+        return self._rows_by_document
+    
+    def _row_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Index vectors of the given rows
+        """
+        if isinstance(self.index, faiss.IndexFlat):
+            # Read straight from the (possibly memory-mapped) flat vector array
+            vectors = faiss.rev_swig_ptr(self.index.get_xb(), self.index.ntotal * self.index.d)
+            return vectors.reshape(self.index.ntotal, self.index.d)[rows]
+        
+        # IVF indexes answer through the direct map added by enable_row_lookup
+        return self.index.reconstruct_batch(rows)
+    
+    def get_context_for_query(self, query: str, top_k: int = 5, packer: Optional[ContextPacker] = None) -> str:
         """
         Get formatted context string for RAG
+        
+        With a packer, the top_k results are candidates that it merges, deduplicates
+        and trims to its token budget (see context_packer.py).
         """
         results = self.search(query, top_k)
-        
+        return self.format_context(packer.pack(results) if packer is not None else results)
+    
+    def format_context(self, results: List[Dict]) -> str:
+        """
+        Format search results as a context string for RAG
+        """
         if not results:
             return "কোনো প্রাসঙ্গিক তথ্য পাওয়া যায়নি।"
         
@@ -211,10 +1304,20 @@ class LegalVectorDatabase:
             doc_name = result['document']
             chunk_idx = result['chunk_index']
             text = result['text']
-            score = result['score']
+            # Keyword lookups in hybrid mode have no similarity score
+            relevance = f" [সম্পর্ক: {result['score']:.3f}]" if result['score'] is not None else ""
+            
+            # Passages merged by the context packer span several chunks
+            chunk_indices = result.get('chunk_indices', [chunk_idx])
+            location = (f"অংশ {chunk_indices[0] + 1}" if len(chunk_indices) == 1
+                        else f"অংশ {chunk_indices[0] + 1}-{chunk_indices[-1] + 1}")
+            page_start = result['metadata'].get('page_start')
+            if page_start:
+                page_end = result['metadata'].get('page_end', page_start)
+                location += f", পৃষ্ঠা {page_start}" if page_end == page_start else f", পৃষ্ঠা {page_start}-{page_end}"
             
             context_part = f"""
-=== {doc_name} (অংশ {chunk_idx + 1}) [সম্পর্ক: {score:.3f}] ===
+=== {doc_name} ({location}){relevance} ===
 {text}
 """
             context_parts.append(context_part)
@@ -253,6 +1356,11 @@ def test_vector_database():
         print(f"Text: {result['text'][:100]}...")
         print("-" * 50)
     
+    # Test batched search
+    batch_results = db.search_batch(["প্রতারণার শাস্তি", "আইনের আশ্রয়"], top_k=1)
+    for results in batch_results:
+        print(f"Batch: {results[0]['document']} - {results[0]['text'][:60]}...")
+    
     return db
 
 if __name__ == "__main__":